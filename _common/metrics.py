@@ -29,11 +29,29 @@
 #
 
 import os
+import copy
 import json
 import time
+import importlib
 from time import gmtime, strftime
 from datetime import datetime
 
+import tracing
+
+# A module that is imported on first use of one of its attributes
+# The plotting modules are imported this way, as they are slow to import and not needed
+# by programs that only collect metrics
+class LazyModule:
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
 # Raw and aggregate circuit metrics
 circuit_metrics = {  }
 group_metrics = { "groups": [],
@@ -57,9 +75,18 @@ verbose = False
 # Option to save metrics to data file
 save_metrics = True 
 
+# Lock shared by benchmark apps running at the same time (see suite module), None = not shared
+# The data file is updated by each app, so the updates are serialized with this lock
+data_file_lock = None
+
 # Option to save plot images (all of them)
 save_plot_images = True
 
+# Option to draw the plots of an app when its run completes
+# If False (data-only mode), plot_metrics only stores the metrics in the data file,
+# and the plots are drawn later from the data file, with render_app_metrics
+do_plots = True
+
 # Option to generate volumetric positioning charts
 do_volumetric_plots = True
 
@@ -149,9 +176,25 @@ def store_metric (group, circuit, metric, value):
         circuit_metrics[group][circuit] = { }
     circuit_metrics[group][circuit][metric] = value
     #print(f'{group} {circuit} {metric} -> {value}')
+    
+    # the create time is stored as soon as the circuit is created, so record its span when tracing
+    if metric == 'create_time':
+        tracing.record_create(group, circuit, value)
+
+
+# Add a circuit to its group with no metrics stored yet, e.g. when submitted to be created later,
+# so the group is not complete until the circuit is executed
+def add_circuit (group, circuit):
+    group = str(group)
+    circuit = str(circuit)
+    if group not in circuit_metrics:
+        circuit_metrics[group] = { }
+    if circuit not in circuit_metrics[group]:
+        circuit_metrics[group][circuit] = { }
 
 
 # Aggregate metrics for a specific group, creating average across circuits in group
+@tracing.traced("aggregate", group_arg=0)
 def aggregate_metrics_for_group (group):
     group = str(group)
     
@@ -358,10 +401,11 @@ def sort_group_metrics():
 ##########################################
 # ANALYSIS AND VISUALIZATION
 
-import matplotlib.pyplot as plt
+plt = LazyModule("matplotlib.pyplot")
     
 # Plot bar charts for each metric over all groups
-def plot_metrics (suptitle="Circuit Width (Number of Qubits)", transform_qubit_group = False, new_qubit_group = None, filters=None, suffix=""):
+@tracing.traced("plot")
+def plot_metrics (suptitle="Circuit Width (Number of Qubits)", transform_qubit_group = False, new_qubit_group = None, filters=None, suffix="", store_data=True):
     
     subtitle = circuit_metrics["subtitle"]
     
@@ -375,7 +419,8 @@ def plot_metrics (suptitle="Circuit Width (Number of Qubits)", transform_qubit_g
     backend_id = subtitle[9:]   
 
     # save the metrics for current application to the DATA file, one file per device
-    if save_metrics:
+    # (not when drawing the plots from the data file)
+    if save_metrics and store_data:
         #data = group_metrics
         #filename = f"DATA-{subtitle[9:]}.json"
         #title = suptitle
@@ -391,6 +436,9 @@ def plot_metrics (suptitle="Circuit Width (Number of Qubits)", transform_qubit_g
             store_app_metrics(backend_id, circuit_metrics, group_metrics, suptitle,
                 start_time=start_time, end_time=end_time)
 
+    # in data-only mode, the plots are drawn later from the data file
+    if not do_plots:
+        return
         
     if len(group_metrics["groups"]) == 0:
         print(f"\n{suptitle}")
@@ -579,7 +627,8 @@ def plot_metrics (suptitle="Circuit Width (Number of Qubits)", transform_qubit_g
         plt.show()       
     
 # Plot bar charts for each metric over all groups
-def plot_metrics_aq (suptitle="Circuit Width (Number of Qubits)", transform_qubit_group = False, new_qubit_group = None, filters=None, suffix=""):
+@tracing.traced("plot")
+def plot_metrics_aq (suptitle="Circuit Width (Number of Qubits)", transform_qubit_group = False, new_qubit_group = None, filters=None, suffix="", store_data=True, aq_data=None):
     
     subtitle = circuit_metrics["subtitle"]
     
@@ -593,7 +642,8 @@ def plot_metrics_aq (suptitle="Circuit Width (Number of Qubits)", transform_qubi
     backend_id = subtitle[9:]   
 
     # save the metrics for current application to the DATA file, one file per device
-    if save_metrics:
+    # (not when drawing the plots from the data file)
+    if save_metrics and store_data:
         #data = group_metrics
         #filename = f"DATA-{subtitle[9:]}.json"
         #title = suptitle
@@ -609,6 +659,9 @@ def plot_metrics_aq (suptitle="Circuit Width (Number of Qubits)", transform_qubi
             store_app_metrics(backend_id, circuit_metrics, group_metrics, suptitle,
                 start_time=start_time, end_time=end_time)
 
+    # in data-only mode, the plots are drawn later from the data file
+    if not do_plots:
+        return
         
     if len(group_metrics["groups"]) == 0:
         print(f"\n{suptitle}")
@@ -752,18 +805,22 @@ def plot_metrics_aq (suptitle="Circuit Width (Number of Qubits)", transform_qubi
     # found it difficult to share the x axis with first 3, but have diff axis for this one
     if do_depths and do_volumetric_plots and do_vbplot:
 
-        aq_metrics={}
-        aq_metrics["groups"]=[]
-        aq_metrics["tr_n2qs"]=[]
-        aq_metrics["aq_fidelities"]=[]
-        for group in circuit_metrics:
-            if group=='subtitle':
-                continue
-        
-            for key in circuit_metrics[group]:
-                aq_metrics["groups"].append(group)
-                aq_metrics["tr_n2qs"].append(circuit_metrics[group][key]["tr_n2q"])
-                aq_metrics["aq_fidelities"].append(circuit_metrics[group][key]["aq_fidelity"])
+        # use the aq metrics given, if drawing from the data file, else collect them from the circuit metrics
+        if aq_data != None:
+            aq_metrics = copy.deepcopy(aq_data)
+        else:
+            aq_metrics={}
+            aq_metrics["groups"]=[]
+            aq_metrics["tr_n2qs"]=[]
+            aq_metrics["aq_fidelities"]=[]
+            for group in circuit_metrics:
+                if group=='subtitle':
+                    continue
+            
+                for key in circuit_metrics[group]:
+                    aq_metrics["groups"].append(group)
+                    aq_metrics["tr_n2qs"].append(circuit_metrics[group][key]["tr_n2q"])
+                    aq_metrics["aq_fidelities"].append(circuit_metrics[group][key]["aq_fidelity"])
         
         w_data = aq_metrics["groups"]
         n2q_tr_data = aq_metrics["tr_n2qs"]
@@ -1567,7 +1624,7 @@ def plot_all_app_metrics(backend_id, do_all_plots=False,
             #print("")
             #print(app)
             group_metrics = shared_data[app]["group_metrics"]
-            plot_metrics(app)
+            plot_metrics(app, store_data=False)
  
 
 def plot_all_app_metrics_aq(backend_id, do_all_plots=False,
@@ -1647,7 +1704,7 @@ def plot_all_app_metrics_aq(backend_id, do_all_plots=False,
             #print("")
             #print(app)
             group_metrics = shared_data[app]["group_metrics"]
-            plot_metrics(app)
+            plot_metrics(app, store_data=False)
  
 ### Plot Metrics for a specific application
 
@@ -1667,7 +1724,56 @@ def plot_metrics_for_app(backend_id, appname, apiname="Qiskit", filters=None, su
     app = "Benchmark Results - " + appname + " - " + apiname
     
     group_metrics = shared_data[app]["group_metrics"]
-    plot_metrics(app, filters=filters, suffix=suffix)
+    plot_metrics(app, filters=filters, suffix=suffix, store_data=False)
+
+### Render the plots of apps from the data file
+
+# Draw the plots of each app stored in the data file for a backend_id, as plot_metrics_aq draws them when
+# the app's run completes; used after running apps in data-only mode (do_plots = False),
+# possibly in another process or on another machine to which the __data directory was copied
+# If include_apps is given, only the apps with those names (e.g. "Deutsch-Jozsa") are drawn
+# If aq is False, the plots are drawn as by plot_metrics, instead of plot_metrics_aq
+def render_app_metrics(backend_id, include_apps=None, aq=True, filters=None, suffix=""):
+    global circuit_metrics
+    global group_metrics
+    global do_plots
+    
+    # load saved data from file
+    api = "qiskit"
+    shared_data = load_app_metrics(api, backend_id)
+    
+    if len(shared_data) == 0:
+        print(f"WARNING: no app metrics stored for device {backend_id}")
+        return
+    
+    # the plots are drawn here, whatever the mode in which the data was collected
+    saved_do_plots = do_plots
+    do_plots = True
+    
+    try:
+        for app in shared_data:
+        
+            # Extract shorter app name from the title passed in by user
+            appname = app[len('Benchmark Results - '):len(app)]
+            appname = appname[:appname.index(' - ')]
+            
+            if include_apps != None and appname not in include_apps:
+                continue
+            
+            # since the bar plots use the subtitle field, set it here
+            circuit_metrics.clear()
+            circuit_metrics["subtitle"] = f"device = {backend_id}"
+            
+            group_metrics = shared_data[app]["group_metrics"]
+            
+            if aq:
+                plot_metrics_aq(app, filters=filters, suffix=suffix, store_data=False,
+                        aq_data=shared_data[app].get("aq_metrics"))
+            else:
+                plot_metrics(app, filters=filters, suffix=suffix, store_data=False)
+    
+    finally:
+        do_plots = saved_do_plots
 
  
 ##### Data File Methods      
@@ -1676,6 +1782,16 @@ def plot_metrics_for_app(backend_id, appname, apiname="Qiskit", filters=None, su
 def store_app_metrics (backend_id, circuit_metrics, group_metrics, app, start_time=None, end_time=None):
     # print(f"... storing {title} {group_metrics}")
     
+    # when other apps may be updating the same data file, load and save it while holding the lock
+    if data_file_lock != None:
+        with data_file_lock:
+            update_app_metrics(backend_id, circuit_metrics, group_metrics, app, start_time, end_time)
+    else:
+        update_app_metrics(backend_id, circuit_metrics, group_metrics, app, start_time, end_time)
+
+# Merge the application metrics into the shared data file for the device
+def update_app_metrics (backend_id, circuit_metrics, group_metrics, app, start_time=None, end_time=None):
+    
     # don't leave slashes in the filename
     backend_id = backend_id.replace("/", "_")
     
@@ -1887,19 +2003,21 @@ def polarization_fidelity(counts, correct_dist, thermal_dist=None):
 # VOLUMETRIC PLOT
   
 import math
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
-from matplotlib.patches import Circle
-
-import matplotlib.cm as cm
+patches = LazyModule("matplotlib.patches")
+cm = LazyModule("matplotlib.cm")
 
 ############### Helper functions
 
 # get a color from selected colormap
-cmap_spectral = plt.get_cmap('Spectral')
-cmap_blues = plt.get_cmap('Blues')
+# colormaps are selected by name, and obtained from matplotlib when first used
+cmap_spectral = 'Spectral'
+cmap_blues = 'Blues'
 cmap = cmap_spectral
 
+@functools.lru_cache(maxsize=None)
+def get_colormap(name):
+    return plt.get_cmap(name)
+
 def get_color(value):
 
     if cmap == cmap_spectral:
@@ -1907,7 +2025,7 @@ def get_color(value):
     elif cmap == cmap_blues:
         value = 0.05 + value*0.8
         
-    return cmap(value)
+    return get_colormap(cmap)(value)
     
     
 # return the base index for a circuit depth value
@@ -1929,7 +2047,7 @@ def box_at(x, y, value, type=1, fill=True):
     fc = get_color(value)
     ec = (0.5,0.5,0.5)
     
-    return Rectangle((x - size/2, y - size/2), size, size,
+    return patches.Rectangle((x - size/2, y - size/2), size, size,
              edgecolor = ec,
              facecolor = fc,
              fill=fill,
@@ -1944,13 +2062,13 @@ def circle_at(x, y, value, type=1, fill=True):
     fc = get_color(value)
     ec = (0.5,0.5,0.5)
     
-    # return Rectangle((x - size/2, y - size/2), size, size,
+    # return patches.Rectangle((x - size/2, y - size/2), size, size,
     #          edgecolor = ec,
     #          facecolor = fc,
     #          fill=fill,
     #          lw=0.5)
     # print(x,y)
-    return Circle((x, y), size/2,
+    return patches.Circle((x, y), size/2,
              alpha = 0.5,
              edgecolor = ec,
              facecolor = fc,
@@ -1967,7 +2085,7 @@ def box4_at(x, y, value, type=1, fill=True):
     ec = (0.3,0.3,0.3)
     ec = fc
     
-    return Rectangle((x - size/8, y - size/2), size/4, size,
+    return patches.Rectangle((x - size/8, y - size/2), size/4, size,
              edgecolor = ec,
              facecolor = fc,
              fill=fill,
@@ -1975,7 +2093,7 @@ def box4_at(x, y, value, type=1, fill=True):
 
 def bkg_box_at(x, y, value):
     size = 0.6
-    return Rectangle((x - size/2, y - size/2), size, size,
+    return patches.Rectangle((x - size/2, y - size/2), size, size,
              edgecolor = (.75,.75,.75),
              facecolor = (.9,.9,.9),
              fill=True,
@@ -1983,7 +2101,7 @@ def bkg_box_at(x, y, value):
              
 def bkg_empty_box_at(x, y, value):
     size = 0.6
-    return Rectangle((x - size/2, y - size/2), size, size,
+    return patches.Rectangle((x - size/2, y - size/2), size, size,
              edgecolor = (.75,.75,.75),
              facecolor = (1.0,1.0,1.0),
              fill=True,
@@ -1992,7 +2110,7 @@ def bkg_empty_box_at(x, y, value):
 # Draw a Quantum Volume rectangle with specified width and depth, and grey-scale value 
 def qv_box_at(x, y, qv_width, qv_depth, value, depth_base):
     #print(f"{qv_width} {qv_depth} {depth_index(qv_depth, depth_base)}")
-    return Rectangle((x - 0.5, y - 0.5), depth_index(qv_depth, depth_base), qv_width,
+    return patches.Rectangle((x - 0.5, y - 0.5), depth_index(qv_depth, depth_base), qv_width,
              edgecolor = (value,value,value),
              facecolor = (value,value,value),
              fill=True,
@@ -2483,3 +2601,26 @@ def test_metrics ():
     plot_metrics()
 
 #test_metrics()
+
+
+# Draw the plots of the apps stored in the data file for a device, in a separate process
+# (run from the directory containing the __data directory), e.g.
+#   python _common/metrics.py qasm_simulator --apps "Deutsch-Jozsa" "Hidden Shift"
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Draw the plots of the apps stored in the data file for a device")
+    parser.add_argument("backend_id", help="device for which the metrics were stored, e.g. qasm_simulator")
+    parser.add_argument("--apps", nargs="+", default=None, help="names of the apps to draw, default = all")
+    parser.add_argument("--no-aq", action="store_true", help="draw the plots as plot_metrics, instead of plot_metrics_aq")
+    parser.add_argument("--all", action="store_true", help="also draw the volumetric plot merged over all apps")
+    parser.add_argument("--suffix", default="", help="suffix of the plot image filenames")
+    args = parser.parse_args()
+
+    render_app_metrics(args.backend_id, include_apps=args.apps, aq=not args.no_aq, suffix=args.suffix)
+
+    if args.all:
+        if args.no_aq:
+            plot_all_app_metrics(args.backend_id, include_apps=args.apps, suffix=args.suffix)
+        else:
+            plot_all_app_metrics_aq(args.backend_id, include_apps=args.apps, suffix=args.suffix)
@@ -0,0 +1,108 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Pipeline Module
+#
+# This module overlaps the creation of the circuits of the next group with the execution of the current one.
+# A benchmark loop creates the circuits of each group (circuit width), submits them, then waits in
+# throttle_execution() until they are executing; the backend is idle while the next group is created.
+# With pipelining enabled, the circuits of each group are created by a function called in a background
+# thread, one group ahead of the loop that submits them. The function creates each circuit with
+# create_circuit(), which only builds it; its metrics and spans are stored by store_created(), called in
+# the loop, so the shared metrics and tracing state is only changed by the main thread:
+#
+#   def create_group(num_qubits):
+#       rng = np.random.RandomState(0)
+#       ... for each circuit of the group:
+#           yield circuit_id, pipeline.create_circuit(lambda: create the circuit, lambda qc: decompose it)
+#
+#   for num_qubits, circuits in pipeline.pipelined(range(min_qubits, max_qubits + 1), create_group):
+#       for circuit_id, created in circuits:
+#           pipeline.store_created(num_qubits, circuit_id, created)
+#           ex.submit_circuit(created["qc"], num_qubits, circuit_id, num_shots)
+#       ex.throttle_execution(metrics.finalize_group)
+#
+# With pipelining off (the default), the generator returned for each group is iterated by the loop,
+# so each circuit is submitted as soon as it is created, as before.
+#
+# The random choices of the circuits in a group are made with a random generator of its own, seeded,
+# as the global one may be used by the main thread, so the circuits are the same in both modes.
+# The create time of a circuit is the CPU time of the thread creating it, in both modes; as the threads
+# share the Python interpreter, the wall time in the background would include time spent waiting for the
+# main thread (and in both modes, for the simulator's threads).
+#
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import tracing
+
+# Option to create the circuits of the next group in a background thread, while the current group executes
+enabled = False
+
+# Create a circuit by calling create(), and decompose it by calling decompose() with it
+# Returns a dict of the decomposed circuit, its create time (the CPU time of the thread creating it) and the
+# wall times at which creating and decomposing it started and ended, and the thread, to store with store_created
+def create_circuit(create, decompose):
+
+    start_time = time.time()
+    start_cpu_time = time.thread_time()
+    qc = create()
+    create_time = time.thread_time() - start_cpu_time
+    create_end_time = time.time()
+
+    qc = decompose(qc)
+
+    return { "qc": qc, "create_time": create_time,
+            "times": (start_time, create_end_time, time.time()),
+            "lane": threading.current_thread().name }
+
+# Store the create time metric of a circuit created by create_circuit, and record its spans when tracing
+def store_created(group, circuit_id, created):
+    start_time, create_end_time, decompose_end_time = created["times"]
+    tracing.record_created(group, circuit_id, start_time, create_end_time, decompose_end_time,
+            lane=created["lane"])
+    metrics.store_metric(group, circuit_id, 'create_time', created["create_time"])
+
+# Return the circuits of the group for the given item, all created in the background thread
+def create_in_background(create_group, item):
+    return list(create_group(item))
+
+# Yield each item with the circuits of its group, in order, as returned by create_group (e.g. a generator)
+# If enabled, the circuits of the next group are all created in a background thread while the caller
+# processes the current one, and are returned as a list; an exception raised in creating them is raised here
+def pipelined(items, create_group):
+
+    items = list(items)
+
+    if not enabled or len(items) < 2:
+        for item in items:
+            yield item, create_group(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline") as pool:
+        future = pool.submit(create_in_background, create_group, items[0])
+
+        for i, item in enumerate(items):
+            result = future.result()
+
+            # start creating the next group before returning this one to be executed
+            if i + 1 < len(items):
+                future = pool.submit(create_in_background, create_group, items[i + 1])
+
+            yield item, result
@@ -0,0 +1,117 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Circuit Statistics Check - Qiskit
+#
+# This program checks that the depth, size and operation counts computed by the circuit_stats module
+# are those computed by qiskit, for random circuits, and for circuits modified in place after their
+# statistics were computed without changing their number of instructions.
+# It exits with status 1 if any check fails, so it can be run as a CI step.
+#
+# Usage (from the top level directory):
+#   python _common/qiskit/check_circuit_stats.py [--circuits N]
+#
+
+import os
+import sys
+import argparse
+
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+from qiskit.circuit import Parameter
+from qiskit.circuit.library import XGate, CXGate
+from qiskit.circuit.random import random_circuit
+
+sys.path[1:1] = [ os.path.dirname(os.path.abspath(__file__)) ]
+import circuit_stats
+
+# Number of random circuits checked
+num_circuits = 50
+
+# Return True if the statistics of the circuit are those computed by qiskit, printing any difference
+def check_stats(name, qc):
+    stats = circuit_stats.get_circuit_stats(qc)
+    expected = { "depth": qc.depth(), "size": qc.size(), "count_ops": dict(qc.count_ops()) }
+    actual = { "depth": stats["depth"], "size": stats["size"], "count_ops": stats["count_ops"] }
+    if actual != expected:
+        print(f"ERROR: {name}: statistics = {actual}, expected {expected}")
+        return False
+    return True
+
+# Return the circuits modified in place after their statistics are computed, as (name, circuit, modify)
+def modified_circuits():
+
+    # replace an instruction, so the gates are on the same qubit
+    qc1 = QuantumCircuit(2)
+    qc1.h(0)
+    qc1.x(1)
+    def replace_instruction():
+        qc1.data[1] = (XGate(), [qc1.qubits[0]], [])
+
+    # swap a 1-qubit gate for a 2-qubit gate
+    qc2 = QuantumCircuit(2)
+    qc2.h(0)
+    qc2.h(1)
+    qc2.x(1)
+    def swap_gate():
+        qc2.data[0] = (CXGate(), [qc2.qubits[0], qc2.qubits[1]], [])
+
+    # bind parameters in place
+    theta = Parameter("theta")
+    qc3 = QuantumCircuit(2)
+    qc3.rx(theta, 0)
+    qc3.cx(0, 1)
+    def assign_parameters():
+        qc3.assign_parameters({ theta: 0.5 }, inplace=True)
+
+    # add a condition to a gate in place, so it depends on the measured bit
+    qr = QuantumRegister(2)
+    cr = ClassicalRegister(1)
+    qc4 = QuantumCircuit(qr, cr)
+    qc4.h(0)
+    qc4.measure(0, 0)
+    instructions = qc4.x(1)
+    def add_condition():
+        instructions.c_if(cr, 1)
+
+    return [ ("replace instruction", qc1, replace_instruction),
+            ("swap gate", qc2, swap_gate),
+            ("assign parameters", qc3, assign_parameters),
+            ("add condition", qc4, add_condition) ]
+
+# Run the checks, returning True if all pass
+def check_circuit_stats(num_circuits=num_circuits):
+
+    passed = True
+    for i in range(num_circuits):
+        qc = random_circuit(2 + i % 6, 1 + i % 10, max_operands=3, measure=(i % 2 == 0),
+                conditional=(i % 3 == 0), seed=i)
+        passed &= check_stats(f"random circuit {i}", qc)
+
+    modified = modified_circuits()
+    for name, qc, modify in modified:
+        passed &= check_stats(f"{name} (before)", qc)
+        modify()
+        passed &= check_stats(name, qc)
+
+    print(f"... circuit statistics checked for {num_circuits} random and {len(modified)} modified circuits")
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the statistics computed by the circuit_stats module")
+    parser.add_argument("--circuits", type=int, default=num_circuits, help="number of random circuits to check")
+    args = parser.parse_args()
+
+    sys.exit(0 if check_circuit_stats(args.circuits) else 1)
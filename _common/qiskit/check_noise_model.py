@@ -0,0 +1,96 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Noise Model Check - Qiskit
+#
+# This program executes a Bell circuit on the Aer simulator with the default noise model, set before
+# the execution target, and again after the noise model is removed with set_noise_model(), and checks
+# that the noisy execution has errors and the noiseless execution has none, i.e. that the noise model
+# bound to the simulator used for noisy jobs is not also applied to noiseless jobs.
+# It exits with status 1 if the check fails, so it can be run as a CI step.
+#
+# Usage (from the top level directory):
+#   python _common/qiskit/check_noise_model.py [--shots N]
+#
+
+import os
+import sys
+import argparse
+
+sys.path[1:1] = [ os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        os.path.dirname(os.path.abspath(__file__)) ]
+import execute as ex
+
+# Number of shots for each execution of the Bell circuit
+num_shots = 1000
+
+# Counts of each execution, keyed by group
+counts = {}
+
+# Store the counts of each execution
+def execution_handler(qc, result, group, circuit, shots):
+    counts[group] = result.get_counts(qc)
+
+# Return a Bell circuit, whose noiseless results are only 00 and 11
+def bell_circuit():
+    from qiskit import QuantumCircuit
+    qc = QuantumCircuit(2, 2, name="bell")
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    return qc
+
+# Return the number of shots whose result is not 00 or 11
+def error_count(group):
+    return sum(count for bits, count in counts[group].items() if bits not in ("00", "11"))
+
+# Run the check, returning True if it passes
+def check_noise_model(num_shots=num_shots):
+
+    # the noise model may be set before the execution target
+    ex.set_noise_model(ex.default_noise_model())
+
+    ex.init_execution(execution_handler)
+    ex.set_execution_target("qasm_simulator")
+
+    # with the default noise model
+    ex.submit_circuit(bell_circuit(), "noisy", 0, num_shots)
+    ex.finalize_execution(None)
+
+    # after the noise model is removed
+    ex.set_noise_model(None)
+    ex.submit_circuit(bell_circuit(), "noiseless", 0, num_shots)
+    ex.finalize_execution(None)
+
+    print(f"... noisy counts = {counts.get('noisy')}, noiseless counts = {counts.get('noiseless')}")
+
+    passed = True
+    if "noisy" not in counts or error_count("noisy") == 0:
+        print("ERROR: no errors in the results with the default noise model")
+        passed = False
+
+    if "noiseless" not in counts or error_count("noiseless") > 0:
+        print("ERROR: errors in the results after the noise model was removed")
+        passed = False
+
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the noise model is applied only to noisy simulation")
+    parser.add_argument("--shots", type=int, default=num_shots, help="number of shots for each execution")
+    args = parser.parse_args()
+
+    sys.exit(0 if check_noise_model(args.shots) else 1)
@@ -0,0 +1,97 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Startup Time Check - Qiskit
+#
+# This program measures the time taken to import the execute and metrics modules in a new
+# Python process, and checks that it stays under a target time, and that the provider, noise
+# and plotting modules (which are imported on first use) are not imported with them.
+# It exits with status 1 if either check fails, so it can be run as a CI step.
+#
+# Usage (from the top level directory):
+#   python _common/qiskit/check_startup_time.py [--target SECS] [--runs N]
+#
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Target time in secs for importing the execute and metrics modules
+target_time = 1.0
+
+# Number of processes in which the import is timed; the median time is compared with the target
+num_runs = 5
+
+# Modules that must not be imported by importing the execute and metrics modules
+deferred_modules = [ "matplotlib", "qiskit_aer", "qiskit.providers.aer", "qiskit.providers.ibmq", "scipy" ]
+
+# Directories containing the execute and metrics modules
+common_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+module_dirs = [ common_dir, os.path.join(common_dir, "qiskit") ]
+
+# Program run in each new process, printing the import time and the deferred modules imported
+timing_program = f"""
+import sys, time, json
+sys.path[1:1] = {module_dirs!r}
+start_time = time.perf_counter()
+import execute, metrics
+import_time = time.perf_counter() - start_time
+print(json.dumps({{ "import_time": import_time,
+        "imported": [name for name in {deferred_modules!r} if name in sys.modules] }}))
+"""
+
+# Time the import in a new process, returning the import time and the deferred modules imported
+def time_import():
+    output = subprocess.run([sys.executable, "-c", timing_program],
+            capture_output=True, text=True, check=True).stdout
+    timing = json.loads(output.strip().splitlines()[-1])
+    return timing["import_time"], timing["imported"]
+
+# Run the checks, returning True if both pass
+def check_startup_time(target_time=target_time, num_runs=num_runs):
+
+    times = []
+    imported = set()
+    for i in range(num_runs):
+        import_time, imported_modules = time_import()
+        times.append(import_time)
+        imported.update(imported_modules)
+
+    median_time = statistics.median(times)
+    print(f"... import execute, metrics: median = {round(median_time, 3)} secs, "
+            f"min = {round(min(times), 3)}, max = {round(max(times), 3)}, target = {target_time} secs")
+
+    passed = True
+    if median_time > target_time:
+        print(f"ERROR: import time {round(median_time, 3)} secs exceeds target of {target_time} secs")
+        passed = False
+
+    if len(imported) > 0:
+        print(f"ERROR: modules imported on import, instead of first use: {sorted(imported)}")
+        passed = False
+
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the startup time of the execute and metrics modules")
+    parser.add_argument("--target", type=float, default=target_time, help="target import time in secs")
+    parser.add_argument("--runs", type=int, default=num_runs, help="number of processes to time")
+    args = parser.parse_args()
+
+    sys.exit(0 if check_startup_time(args.target, args.runs) else 1)
@@ -0,0 +1,297 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Circuit Cache Module - Qiskit
+#
+# This module provides a cache of transpiled circuits, so that repeated runs of the same
+# circuits on the same target can skip transpilation.
+# Circuits are identified by a fingerprint of their content, independent of the names of the
+# circuit and its registers, so identical circuits created in different runs share a cache entry.
+# The cache has two tiers: an in-memory LRU cache, and an on-disk cache of QPY files
+# stored in the __cache directory.
+# It also provides an on-disk cache of simulation results, used by the execute module to skip
+# the execution of circuits whose results are already known (see execute.use_result_cache).
+#
+
+import os
+import json
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from qiskit import transpile as qiskit_transpile
+from qiskit import qpy
+from qiskit.circuit.library.standard_gates import get_standard_gate_name_mapping
+
+# Directory in which the on-disk cache files are stored
+cache_dir = "__cache"
+
+# Option to store and load transpiled circuits to and from disk
+use_disk_cache = True
+
+# Maximum number of transpiled circuits kept in memory
+max_memory_entries = 256
+
+# Print cache hits and misses
+verbose = False
+
+# In-memory LRU cache of transpiled circuits, keyed by transpile key
+transpile_cache = OrderedDict()
+
+# Counts of cache lookups, for reporting
+cache_stats = { "memory_hits": 0, "disk_hits": 0, "misses": 0, "result_hits": 0, "result_misses": 0 }
+
+# Names of the standard gates, which are identified by name and params only
+_standard_gate_names = set(get_standard_gate_name_mapping().keys())
+
+######################################################################
+# CIRCUIT FINGERPRINT
+
+# Compute a fingerprint of the circuit content, as a hex digest
+# Instructions are identified by name, params, and the positions of their qubits and clbits;
+# the definitions of non-standard gates are included, so differently defined gates do not collide
+def circuit_fingerprint(qc):
+    hasher = hashlib.sha256()
+    _hash_circuit(hasher, qc, {})
+    return hasher.hexdigest()
+
+# Add the content of a circuit to the hasher, memoizing the digest of each sub-definition
+# The memo is keyed by id of the definition, and holds the definition with its digest, so that
+# the definition is not freed, and its id reused by another, while the fingerprint is computed
+def _hash_circuit(hasher, qc, definition_digests):
+
+    qubit_indices = { bit: index for index, bit in enumerate(qc.qubits) }
+    clbit_indices = { bit: index for index, bit in enumerate(qc.clbits) }
+
+    # the register sizes determine the format of the counts
+    hasher.update(f"{qc.num_qubits}/{qc.num_clbits}/{[creg.size for creg in qc.cregs]}".encode())
+    _hash_param(hasher, qc.global_phase)
+
+    for circuit_instruction in qc.data:
+        instruction = circuit_instruction.operation
+        qubits = [qubit_indices[q] for q in circuit_instruction.qubits]
+        clbits = [clbit_indices[c] for c in circuit_instruction.clbits]
+        hasher.update(f"|{instruction.name}{qubits}{clbits}".encode())
+
+        for param in instruction.params:
+            _hash_param(hasher, param)
+
+        condition = getattr(instruction, "condition", None)
+        if condition is not None:
+            target, value = condition
+            if hasattr(target, "size"):
+                hasher.update(f"c{[clbit_indices[c] for c in target]}={value}".encode())
+            else:
+                hasher.update(f"c{clbit_indices[target]}={value}".encode())
+
+        # include the definition of custom gates and sub-circuits
+        if instruction.name not in _standard_gate_names:
+            definition = instruction.definition
+            if definition is not None:
+                key = id(definition)
+                if key not in definition_digests:
+                    sub_hasher = hashlib.sha256()
+                    _hash_circuit(sub_hasher, definition, definition_digests)
+                    definition_digests[key] = (definition, sub_hasher.hexdigest())
+                hasher.update(definition_digests[key][1].encode())
+
+# Add an instruction parameter to the hasher
+def _hash_param(hasher, param):
+    if isinstance(param, np.ndarray):
+        hasher.update(param.tobytes())
+    elif _is_parameterized(param):
+        hasher.update(str(param).encode())
+    elif isinstance(param, (int, float, complex, np.number)):
+        hasher.update(repr(complex(param)).encode())
+    else:
+        hasher.update(repr(param).encode())
+    hasher.update(b",")
+
+def _is_parameterized(value):
+    return hasattr(value, "parameters") and len(value.parameters) > 0
+
+######################################################################
+# TRANSPILE CACHE
+
+# Transpile a circuit, returning a cached result if the same circuit has been
+# transpiled before for the same target and options
+# The cache key includes the backend target, basis_gates, optimization_level,
+# layout_method, routing_method and seed_transpiler
+def transpile(qc, backend=None, **kwargs):
+
+    key = transpile_key(qc, backend, **kwargs)
+
+    # look up the circuit in memory first
+    if key in transpile_cache:
+        transpile_cache.move_to_end(key)
+        cache_stats["memory_hits"] += 1
+        if verbose: print(f"... transpile cache hit (memory) {key[:12]}")
+        return _renamed(transpile_cache[key], qc)
+
+    # then on disk
+    trans_qc = _load_from_disk(key)
+    if trans_qc is not None:
+        cache_stats["disk_hits"] += 1
+        if verbose: print(f"... transpile cache hit (disk) {key[:12]}")
+
+    else:
+        cache_stats["misses"] += 1
+        trans_qc = qiskit_transpile(qc, backend, **kwargs)
+        _save_to_disk(key, trans_qc)
+
+    _store_in_memory(key, trans_qc)
+
+    return _renamed(trans_qc, qc)
+
+# Compute the cache key for transpiling a circuit to a backend with the given options
+def transpile_key(qc, backend=None, **kwargs):
+
+    target = { "backend": backend_target(backend) }
+    for name, value in sorted(kwargs.items()):
+        target[name] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+
+    target_str = json.dumps(target, sort_keys=True, default=str)
+    return hashlib.sha256((circuit_fingerprint(qc) + target_str).encode()).hexdigest()
+
+# Return a description of the backend target, including its name, version, basis gates and coupling map
+def backend_target(backend):
+
+    if backend is None:
+        return None
+
+    name = backend.name() if callable(getattr(backend, "name", None)) else str(getattr(backend, "name", ""))
+    target = { "name": name }
+
+    if callable(getattr(backend, "configuration", None)):
+        config = backend.configuration()
+        target["version"] = getattr(config, "backend_version", None)
+        target["basis_gates"] = getattr(config, "basis_gates", None)
+        target["coupling_map"] = getattr(config, "coupling_map", None)
+
+    return target
+
+# Clear the in-memory cache, and optionally the on-disk cache, including the cached results
+def clear_cache(disk=False):
+    transpile_cache.clear()
+
+    if disk:
+        for subdir, extension in [("transpile", ".qpy"), ("results", ".json")]:
+            cache_path = os.path.join(cache_dir, subdir)
+            if os.path.isdir(cache_path):
+                for filename in os.listdir(cache_path):
+                    if filename.endswith(extension):
+                        os.remove(os.path.join(cache_path, filename))
+
+# The cached circuit was transpiled from a circuit that may have had a different name, which
+# is used to identify the result; return a copy named as the circuit being transpiled
+def _renamed(trans_qc, qc):
+    trans_qc = trans_qc.copy(name=qc.name)
+    trans_qc.metadata = qc.metadata
+    return trans_qc
+
+def _store_in_memory(key, trans_qc):
+    transpile_cache[key] = trans_qc
+    transpile_cache.move_to_end(key)
+    while len(transpile_cache) > max_memory_entries:
+        transpile_cache.popitem(last=False)
+
+def _disk_path(key):
+    return os.path.join(cache_dir, "transpile", key + ".qpy")
+
+def _load_from_disk(key):
+    if not use_disk_cache:
+        return None
+
+    filename = _disk_path(key)
+    if not os.path.isfile(filename):
+        return None
+
+    try:
+        with open(filename, "rb") as f:
+            return qpy.load(f)[0]
+
+    except Exception as e:
+        print(f"WARNING: unable to load cached circuit {filename}, exception = {e}")
+        return None
+
+def _save_to_disk(key, trans_qc):
+    if not use_disk_cache:
+        return
+
+    filename = _disk_path(key)
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+        # write to a temporary file first, so a partially written file is never loaded
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "wb") as f:
+            qpy.dump(trans_qc, f)
+        os.replace(tmp_filename, filename)
+
+    except Exception as e:
+        print(f"WARNING: unable to save cached circuit {filename}, exception = {e}")
+
+######################################################################
+# RESULT CACHE
+
+# Compute the cache key for the result of executing a circuit, from its fingerprint and
+# a dict describing everything else the result depends on (backend, noise model, shots, seed, ...)
+def result_key(qc, execution):
+    execution_str = json.dumps(execution, sort_keys=True, default=str)
+    return hashlib.sha256((circuit_fingerprint(qc) + execution_str).encode()).hexdigest()
+
+# Return the cached entry for the given result key, or None if not cached
+# The entry is a dict holding the result (as a dict) and any other data stored with it
+def load_result(key):
+
+    filename = os.path.join(cache_dir, "results", key + ".json")
+    if not os.path.isfile(filename):
+        cache_stats["result_misses"] += 1
+        return None
+
+    try:
+        with open(filename, "r") as f:
+            entry = json.load(f)
+
+    except Exception as e:
+        print(f"WARNING: unable to load cached result {filename}, exception = {e}")
+        cache_stats["result_misses"] += 1
+        return None
+
+    cache_stats["result_hits"] += 1
+    if verbose: print(f"... result cache hit {key[:12]}")
+    return entry
+
+# Store an entry in the result cache
+def save_result(key, entry):
+
+    filename = os.path.join(cache_dir, "results", key + ".json")
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+        # write to a temporary file first, so a partially written file is never loaded
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "w") as f:
+            json.dump(entry, f, default=_json_value)
+        os.replace(tmp_filename, filename)
+
+    except Exception as e:
+        print(f"WARNING: unable to save cached result {filename}, exception = {e}")
+
+# Convert a value that is not JSON serializable, e.g. numpy numbers, to one that is
+def _json_value(value):
+    return value.item() if hasattr(value, "item") else str(value)
@@ -0,0 +1,123 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Circuit Statistics Module - Qiskit
+#
+# This module computes the size statistics of a circuit in a single pass over its instructions,
+# in place of separate calls to depth(), size() and count_ops(), each of which walks the circuit.
+# Gates are classified by the number of qubits they act on (arity), not by their name.
+# The statistics are not memoized, as a circuit may be modified in place (e.g. qc.data[i] = ..., or
+# c_if()) in ways that cannot be detected without another pass over its instructions.
+#
+
+# Return a dict of statistics for the given circuit:
+#   depth       - circuit depth, as computed by qc.depth()
+#   size        - number of operations, as computed by qc.size()
+#   count_ops   - count of each operation by name, as computed by qc.count_ops()
+#   arity_counts - count of gates by number of qubits (measure, reset and directives excluded)
+#   depth_2q    - depth counting only the gates on 2 or more qubits
+#   n1q, n2q    - number of 1-qubit gates and of gates on 2 or more qubits
+#   xi          - ratio of gates on 2 or more qubits to all gates
+def get_circuit_stats(qc):
+    return compute_circuit_stats(qc)
+
+# Compute the statistics for the given circuit, in one pass over its instructions
+def compute_circuit_stats(qc):
+
+    bit_indices = { bit: index for index, bit in enumerate(qc.qubits + qc.clbits) }
+
+    # depth reached on each bit, counting all operations, and counting only multi-qubit gates
+    op_stack = [0] * len(bit_indices)
+    op_stack_2q = [0] * len(bit_indices)
+
+    size = 0
+    count_ops = {}
+    arity_counts = {}
+
+    for item in qc.data:
+
+        # instructions are CircuitInstruction objects, or (operation, qargs, cargs) tuples in older qiskit
+        if type(item) is tuple:
+            operation, qargs, cargs = item
+        else:
+            operation = item.operation; qargs = item.qubits; cargs = item.clbits
+
+        name = operation.name
+        count_ops[name] = count_ops.get(name, 0) + 1
+
+        # directives (e.g. barrier) do not add to the size or depth
+        if operation._directive:
+            if len(qargs) > 1:
+                level = max([op_stack[bit_indices[bit]] for bit in qargs])
+                level_2q = max([op_stack_2q[bit_indices[bit]] for bit in qargs])
+                for bit in qargs:
+                    op_stack[bit_indices[bit]] = level
+                    op_stack_2q[bit_indices[bit]] = level_2q
+            continue
+
+        size += 1
+        num_qubits = len(qargs)
+
+        # the bits on which the operation depends, including any condition bits
+        if len(cargs) == 0 and operation.condition is None:
+            reg_ints = [bit_indices[bit] for bit in qargs]
+        else:
+            reg_ints = [bit_indices[bit] for bit in qargs]
+            reg_ints.extend([bit_indices[bit] for bit in cargs])
+
+            condition = operation.condition
+            if condition:
+                condition_bits = condition[0] if hasattr(condition[0], "size") else [condition[0]]
+                for bit in condition_bits:
+                    index = bit_indices[bit]
+                    if index not in reg_ints:
+                        reg_ints.append(index)
+
+        if num_qubits == 1 and len(reg_ints) == 1:
+            index = reg_ints[0]
+            op_stack[index] += 1
+        else:
+            level = max([op_stack[index] for index in reg_ints]) + 1
+            for index in reg_ints:
+                op_stack[index] = level
+
+        # measure and reset are not counted as gates
+        if name == "measure" or name == "reset":
+            if len(reg_ints) > 1:
+                level_2q = max([op_stack_2q[index] for index in reg_ints])
+                for index in reg_ints:
+                    op_stack_2q[index] = level_2q
+            continue
+
+        arity_counts[num_qubits] = arity_counts.get(num_qubits, 0) + 1
+
+        if num_qubits >= 2 or len(reg_ints) > 1:
+            level_2q = max([op_stack_2q[index] for index in reg_ints]) + (1 if num_qubits >= 2 else 0)
+            for index in reg_ints:
+                op_stack_2q[index] = level_2q
+
+    n1q = arity_counts.get(1, 0) + arity_counts.get(0, 0)
+    n2q = sum([count for arity, count in arity_counts.items() if arity >= 2])
+    xi = n2q / (n1q + n2q) if (n1q + n2q) > 0 else 0
+
+    return { "depth": max(op_stack) if len(op_stack) > 0 else 0,
+            "size": size,
+            "count_ops": count_ops,
+            "arity_counts": arity_counts,
+            "depth_2q": max(op_stack_2q) if len(op_stack_2q) > 0 else 0,
+            "n1q": n1q,
+            "n2q": n2q,
+            "xi": xi }
@@ -0,0 +1,200 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Concurrency Control Module - Qiskit
+#
+# This module adapts the maximum number of active jobs to the backend, as jobs complete.
+# The limit is increased by one while all the active job slots are in use and the backend keeps up,
+# and decreased when it does not (additive increase, multiplicative decrease on failures):
+#   - a job fails: the limit is halved
+#   - the time a job spends queued (elapsed time less execution time) grows well above the
+#     shortest observed: the limit is decreased by one
+#   - local simulators: the CPU load exceeds the number of cores, or available memory is low:
+#     the limit is decreased by one
+#   - remote backends: the limit never exceeds the number of jobs the provider allows (job_limit())
+# The limit is bounded by the number of cores for local simulators.
+#
+
+import os
+import time
+
+# Minimum and maximum number of active jobs, None = derived from the backend
+min_jobs_active = 1
+max_jobs_limit = None
+
+# Upper bound for remote backends that do not report a job limit
+default_remote_limit = 20
+
+# Decrease when the queued time exceeds this factor of the shortest queued time, and by this many secs
+latency_factor = 2.0
+latency_margin = 1.0
+
+# Weight of the latest queued time in its moving average
+latency_smoothing = 0.3
+
+# Decrease when the CPU load exceeds this fraction of the cores; increase only below the lower fraction
+max_cpu_load = 1.0
+low_cpu_load = 0.75
+
+# Decrease when the fraction of available memory falls below this
+min_free_memory = 0.1
+
+# Minimum secs between decreases of the limit, other than on failures, so each can take effect
+# (the CPU load is an average over the last minute, and the queued time a moving average)
+adjust_interval = 5.0
+
+# Minimum secs between queries of the provider's job limit
+job_limit_interval = 30.0
+
+# Print the decisions as they are made
+verbose = False
+
+# Moving average and minimum of the time jobs spend queued, and the last known provider job limit
+queued_time_avg = None
+queued_time_min = None
+provider_limit = None
+provider_limit_time = 0
+last_decrease_time = 0
+
+# Log of the decisions made, as (time, limit, reason)
+decision_log = []
+
+# Reset the state of the controller, at the start of an app
+def init_controller():
+    global queued_time_avg, queued_time_min, provider_limit, provider_limit_time, last_decrease_time
+    queued_time_avg = None
+    queued_time_min = None
+    provider_limit = None
+    provider_limit_time = 0
+    last_decrease_time = 0
+    decision_log.clear()
+
+# Return the new maximum number of active jobs, after a job has completed (or failed),
+# and the reason for the change, or None if unchanged
+# num_active is the number of jobs active when the job completed, including it
+def next_jobs_active(limit, backend, num_active, elapsed_time=0, exec_time=0, failed=False):
+    global queued_time_avg, queued_time_min, last_decrease_time
+
+    new_limit = limit
+    reason = None
+    saturated = num_active >= limit
+
+    if failed:
+        new_limit = limit // 2
+        reason = "job failed"
+
+    else:
+        # track the time spent queued, rather than executing
+        queued_time = max(elapsed_time - exec_time, 0)
+        if queued_time_avg == None:
+            queued_time_avg = queued_time
+        else:
+            queued_time_avg += latency_smoothing * (queued_time - queued_time_avg)
+        queued_time_min = queued_time if queued_time_min == None else min(queued_time_min, queued_time)
+
+        load, free_memory = system_load() if is_local(backend) else (None, None)
+
+        if queued_time_avg > queued_time_min * latency_factor + latency_margin:
+            reason = f"queued time {round(queued_time_avg, 3)}"
+
+        elif load != None and load > max_cpu_load:
+            reason = f"cpu load {round(load, 2)}"
+
+        elif free_memory != None and free_memory < min_free_memory:
+            reason = f"free memory {round(free_memory, 2)}"
+
+        # wait for the previous decrease to take effect before decreasing again
+        if reason != None:
+            if time.time() - last_decrease_time >= adjust_interval:
+                new_limit = limit - 1
+
+        elif saturated and (load == None or load < low_cpu_load):
+            new_limit = limit + 1
+            reason = "saturated"
+
+    # keep within the bounds for the backend
+    upper_limit = max_jobs_active_for(backend, num_active)
+    if new_limit > upper_limit:
+        new_limit = upper_limit
+        reason = "backend limit" if new_limit < limit else reason
+    new_limit = max(new_limit, min_jobs_active)
+
+    if new_limit == limit:
+        return limit, None
+
+    if new_limit < limit:
+        last_decrease_time = time.time()
+    decision_log.append((time.time(), new_limit, reason))
+    if verbose:
+        print(f"... max jobs active {limit} -> {new_limit}, {reason}")
+
+    return new_limit, reason
+
+# Return the upper bound on the number of active jobs for the backend
+def max_jobs_active_for(backend, num_active=0):
+    global provider_limit, provider_limit_time
+
+    if max_jobs_limit != None:
+        return max_jobs_limit
+
+    if is_local(backend):
+        return os.cpu_count() or 1
+
+    # the provider's limit applies to all of the account's jobs, including those of other programs
+    if callable(getattr(backend, "job_limit", None)) and time.time() - provider_limit_time > job_limit_interval:
+        provider_limit_time = time.time()
+        try:
+            job_limit = backend.job_limit()
+            if job_limit.maximum_jobs != None:
+                provider_limit = job_limit.maximum_jobs - job_limit.active_jobs + num_active
+        except Exception as e:
+            print(f"WARNING: unable to obtain job limit of backend, exception = {e}")
+
+    return max(provider_limit, 1) if provider_limit != None else default_remote_limit
+
+# Return True if the backend is a simulator run locally
+def is_local(backend):
+    try:
+        return bool(getattr(backend.configuration(), "local", False))
+    except Exception:
+        return False
+
+# Return the CPU load, as a fraction of the number of cores, and the fraction of memory available
+# Either is None if it cannot be obtained on this platform
+def system_load():
+    load = None
+    free_memory = None
+
+    try:
+        load = os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        pass
+
+    # on Linux, the available memory includes the memory that can be reclaimed from caches
+    try:
+        meminfo = {}
+        with open("/proc/meminfo") as f:
+            for line in f:
+                name, value = line.split(":", 1)
+                meminfo[name] = int(value.split()[0])
+        free_memory = meminfo["MemAvailable"] / meminfo["MemTotal"]
+    except (OSError, KeyError, ValueError):
+        try:
+            free_memory = os.sysconf("SC_AVPHYS_PAGES") / os.sysconf("SC_PHYS_PAGES")
+        except (AttributeError, ValueError, OSError):
+            pass
+
+    return load, free_memory
@@ -0,0 +1,229 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Exact Execution Module - Qiskit
+#
+# This module computes the exact outcome distribution of a circuit, in place of sampling its shots:
+#   - from its statevector, for noiseless simulation (see exact_execution option of the execute module)
+#   - from a density matrix simulation with the noise model, for noisy simulation of circuits up to
+#     max_density_matrix_qubits wide (see density_matrix_execution option of the execute module)
+# The distribution is returned as the expected counts for the given shots (probability x shots),
+# keyed by the hex value of the classical bits as in the counts of a simulator result, so that a
+# result handler computes the fidelity from it as from sampled counts, with no shot noise.
+#
+# Only circuits whose measurements are all at the end can be computed this way; circuits with
+# measurements followed by other operations on the same qubits, resets or conditional operations
+# must be sampled as usual. With noise, the readout errors of the noise model are applied to the
+# distribution; noise models with other errors on measurements require sampling too.
+#
+
+import numpy as np
+
+from qiskit import transpile
+from qiskit.quantum_info import Statevector
+from qiskit.result import Result
+
+# Maximum number of qubits of a circuit whose statevector is computed
+max_qubits = 24
+
+# Maximum number of qubits of a circuit whose density matrix is computed, for noisy simulation
+max_density_matrix_qubits = 10
+
+# Outcomes with a smaller probability are omitted from the counts
+min_probability = 1e-12
+
+# Return the qubit measured into each classical bit, as a dict of clbit index keyed by qubit index,
+# or None if the measurements are not all at the end of the circuit
+def final_measurements(qc):
+
+    measured = {}
+    measured_clbits = set()
+
+    for instruction in qc.data:
+        op = instruction.operation
+        qubits = [qc.find_bit(qubit).index for qubit in instruction.qubits]
+        clbits = [qc.find_bit(clbit).index for clbit in instruction.clbits]
+
+        if getattr(op, "condition", None) != None or op.name == "reset":
+            return None
+
+        if op.name == "barrier":
+            continue
+
+        if op.name == "measure":
+            if qubits[0] in measured or clbits[0] in measured_clbits:
+                return None
+            measured[qubits[0]] = clbits[0]
+            measured_clbits.add(clbits[0])
+            continue
+
+        # any other operation after a measurement of its qubits, or writing classical bits
+        if len(clbits) > 0 or any([qubit in measured for qubit in qubits]):
+            return None
+
+    return measured if len(measured) > 0 else None
+
+# Return the expected counts of the circuit for the given shots, as a dict keyed by the hex value
+# of the classical bits, or None if it cannot be computed exactly
+def get_exact_counts(qc, shots):
+
+    if qc.num_qubits > max_qubits:
+        return None
+
+    measured = final_measurements(qc)
+    if measured == None:
+        return None
+
+    try:
+        statevector = Statevector(qc.remove_final_measurements(inplace=False))
+    except Exception:
+        return None
+
+    # probabilities of the measured qubits, with the first qubit as the least significant bit
+    probabilities = statevector.probabilities(qargs=list(measured.keys()))
+
+    return outcome_counts(probabilities, measured, shots)
+
+# Density matrix simulator with the noise model bound, and the noise model it was built with
+density_matrix_simulator = None
+density_matrix_noise = None
+
+# Return the expected counts of the circuit with the given noise model for the given shots, from a
+# density matrix simulation, as a dict keyed by the hex value of the classical bits,
+# or None if it cannot be computed exactly
+def get_noisy_counts(qc, shots, noise_model):
+
+    if qc.num_qubits > max_density_matrix_qubits:
+        return None
+
+    readout = get_readout_errors(noise_model)
+    if readout == None:
+        return None
+
+    # the noise model applies to its basis gates, so transpile to them as for a sampled simulation
+    trans_qc = transpile(qc, basis_gates=noise_model.basis_gates)
+
+    measured = final_measurements(trans_qc)
+    if measured == None:
+        return None
+
+    from qiskit.providers.aer.library import SaveDensityMatrix
+
+    # replace the measurements with the saving of the density matrix of the measured qubits,
+    # whose diagonal holds the probabilities of their outcomes
+    qubits = list(measured.keys())
+    dm_qc = trans_qc.remove_final_measurements(inplace=False)
+    dm_qc.append(SaveDensityMatrix(len(qubits)), [dm_qc.qubits[qubit] for qubit in qubits])
+
+    try:
+        result = get_density_matrix_simulator(noise_model).run(dm_qc, shots=1).result()
+        probabilities = np.real(np.diag(np.asarray(result.data(0)["density_matrix"])))
+    except Exception as e:
+        print(f"WARNING: density matrix simulation of circuit {qc.name} failed, sampling it")
+        print(f"... exception = {e}")
+        return None
+
+    probabilities = apply_readout_errors(probabilities, qubits, readout)
+
+    return outcome_counts(probabilities, measured, shots)
+
+# Return the density matrix simulator with the noise model bound, built on first use for each noise model
+def get_density_matrix_simulator(noise_model):
+    global density_matrix_simulator, density_matrix_noise
+
+    if density_matrix_simulator == None or density_matrix_noise is not noise_model:
+        from qiskit.providers.aer import AerSimulator
+        density_matrix_simulator = AerSimulator(method="density_matrix", noise_model=noise_model)
+        density_matrix_noise = noise_model
+
+    return density_matrix_simulator
+
+# Return the readout errors of the noise model, as a dict of the 2x2 matrix of probabilities of
+# measuring each value for each actual value, keyed by qubit index (None for all other qubits)
+# Returns None if the noise model has errors on measurements that cannot be applied to the distribution:
+# quantum errors on measurements, or readout errors correlated between qubits
+def get_readout_errors(noise_model):
+
+    readout = {}
+    for error in noise_model.to_dict()["errors"]:
+        if "measure" not in error.get("operations", []):
+            continue
+
+        if error["type"] != "roerror":
+            return None
+
+        probabilities = np.asarray(error["probabilities"], dtype=float)
+        if probabilities.shape != (2, 2):
+            return None
+
+        for gate_qubits in error.get("gate_qubits", [[None]]):
+            readout[gate_qubits[0]] = probabilities
+
+    return readout
+
+# Apply the readout errors to the probabilities of the measured qubits, with the first qubit
+# as the least significant bit, returning the probabilities of the measured values
+def apply_readout_errors(probabilities, qubits, readout):
+
+    if len(readout) == 0:
+        return probabilities
+
+    # as a tensor with one axis per qubit, the last qubit on the first axis
+    num_qubits = len(qubits)
+    tensor = probabilities.reshape([2] * num_qubits)
+
+    for k, qubit in enumerate(qubits):
+        matrix = readout.get(qubit, readout.get(None))
+        if matrix is None:
+            continue
+        axis = num_qubits - 1 - k
+        tensor = np.moveaxis(np.tensordot(tensor, matrix, axes=([axis], [0])), -1, axis)
+
+    return tensor.reshape(-1)
+
+# Return the expected counts for the given shots from the probabilities of the measured qubits,
+# as a dict keyed by the hex value of the classical bits they are measured into
+def outcome_counts(probabilities, measured, shots):
+
+    qubits = list(measured.keys())
+
+    # map the outcomes of the measured qubits to the values of the classical bits they are measured into
+    outcomes = np.nonzero(probabilities > min_probability)[0]
+    values = np.zeros(len(outcomes), dtype=np.int64)
+    for k, qubit in enumerate(qubits):
+        values |= ((outcomes >> k) & 1) << measured[qubit]
+
+    counts = {}
+    for value, probability in zip(values, probabilities[outcomes]):
+        counts[hex(int(value))] = float(probability) * shots
+
+    return counts
+
+# Return a result object for the given circuits, with the expected counts and execution time of each
+# Each experiment is given as a tuple of (circuit, counts, shots, time taken), computed by the given method
+def build_result(experiments, backend_name, job_id, method="exact"):
+
+    results = []
+    for qc, counts, shots, time_taken in experiments:
+        header = { "name": qc.name, "memory_slots": qc.num_clbits, "n_qubits": qc.num_qubits,
+                "creg_sizes": [[creg.name, creg.size] for creg in qc.cregs],
+                "clbit_labels": [[creg.name, i] for creg in qc.cregs for i in range(creg.size)] }
+        results.append({ "shots": shots, "success": True, "header": header,
+                "data": { "counts": counts }, "time_taken": time_taken, "metadata": { "method": method } })
+
+    return Result.from_dict({ "backend_name": backend_name, "backend_version": "exact",
+            "qobj_id": job_id, "job_id": job_id, "success": True, "results": results,
+            "time_taken": sum([experiment[3] for experiment in experiments]) })
@@ -23,32 +23,53 @@
 # execution, so they can be aggregated and presented to the user.
 #
 
+import os
 import time
 import copy
+import asyncio
+import functools
 import metrics
+import tracing
+import circuit_cache
+import circuit_stats
+import concurrency
+import job_journal
+import job_status
 import importlib
-from collections import Counter
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-from qiskit import execute, Aer, transpile
-from qiskit import IBMQ
+# The provider (Aer, IBMQ) and noise modules are imported on first use, as they are slow to import
+from qiskit import execute, transpile, QuantumCircuit
 from qiskit.providers.jobstatus import JobStatus
+from qiskit.result import Result
 
-# Noise
-from qiskit.providers.aer.noise import NoiseModel, ReadoutError
-from qiskit.providers.aer.noise import depolarizing_error, reset_error
-
-# Use Aer qasm_simulator by default
-backend = Aer.get_backend("qasm_simulator")  
+# Use Aer qasm_simulator by default, created in init_execution() if no backend has been set
+backend = None
 
 # Execution options, passed to transpile method
 backend_exec_options = None
 
+# Execution options that are passed to the Aer simulator when running a job, if given
+simulator_option_names = [ "max_parallel_threads", "max_parallel_experiments", "max_parallel_shots",
+        "method", "fusion_enable", "fusion_threshold", "fusion_max_qubit" ]
+
+# Option to divide the cores between the jobs active at the same time on the Aer simulator,
+# when max_parallel_threads is not given in the execution options, so concurrent jobs
+# do not each start a thread per core
+divide_parallel_threads = True
+
 #####################
 # DEFAULT NOISE MODEL 
 
 # default noise model, can be overridden using set_noise_model
 def default_noise_model():
 
+    from qiskit.providers.aer.noise import NoiseModel, ReadoutError
+    from qiskit.providers.aer.noise import depolarizing_error, reset_error
+
     noise = NoiseModel()
     # Add depolarizing error to all single qubit gates with error rate 0.3%
     #                    and to all two qubit gates with error rate 3.0%
@@ -77,18 +98,39 @@ def default_noise_model():
     
     return noise
 
-noise = default_noise_model()
+# Noise model used for simulation; the default noise model is created on first use
+noise = None
+use_default_noise = True
+
+# Instance of the simulator backend with the noise model bound to it, used for all noisy simulation jobs,
+# so the noise model is not passed (and validated) with each job; built when the backend or noise is set
+noisy_backend = None
+
+# The backend and noise model from which the noisy backend was built
+noisy_backend_source = (None, None)
 
 ##########################
 # JOB MANAGEMENT VARIABLES 
 
-# Create array of batched circuits and a dict of active circuits
-batched_circuits = []
+# Create a queue of batched circuits and a dict of active circuits
+batched_circuits = deque()
 active_circuits = {}
 
+# Event set by job completion callbacks, for jobs that wrap a future (e.g. Aer jobs)
+# This allows the wait loops to wake up as soon as a job is done, instead of sleeping
+job_completion_event = threading.Event()
+
 # maximum number of active jobs
 max_jobs_active = 5;
 
+# Option to adapt the maximum number of active jobs to the backend as jobs complete (see concurrency module)
+# Each circuit's max_jobs_active metric records the limit in effect when its job completed
+adaptive_jobs_active = False
+
+# Semaphore shared by benchmark apps running at the same time (see suite module), None = not shared
+# Each active job holds one of its slots, limiting the number of active jobs across all the apps
+shared_job_slots = None
+
 # Configure a handler for processing circuits on completion
 # user-supplied result handler
 result_handler = None
@@ -96,6 +138,51 @@ result_handler = None
 # job mode: False = wait, True = submit multiple jobs
 job_mode = False
 
+# Option to pack all circuits of a group into a single multi-circuit job
+# The combined result is split into the result for each circuit on completion
+batch_group_jobs = False
+
+# Maximum number of circuits in one group job, None = use the backend's max_experiments
+max_circuits_per_job = None
+
+# Circuits of the current group, held until the group is complete to be submitted as a group job
+pending_group_circuits = []
+
+# Number of jobs into which the shots of each circuit are split, to be executed at the same time
+# The counts of the jobs are merged into one result for the circuit before its result handler is invoked
+shot_splits = 1
+
+# Maximum number of shots in one job, None = the backend's max_shots
+# The shots of a circuit exceeding this are split into as many jobs as needed
+max_shots_per_job = None
+
+# Option to cache the results of circuits executed on the Aer simulator (see circuit_cache module)
+# A circuit executed again with the same noise model, shots, seed and execution options
+# uses its cached result (and metrics), with no job launched
+use_result_cache = False
+
+# Seed for the simulator, for reproducible results; with the result cache, 0 is used if not set
+seed_simulator = None
+
+# Option to compute the result of each circuit exactly from its statevector, instead of sampling its shots,
+# when executing on the Aer simulator with no noise (see exact_execution module)
+# The result handler is given the expected counts (probability x shots), so the fidelity has no shot noise;
+# circuits with measurements before other operations are sampled as usual
+exact_execution = False
+
+# Option to compute the result of each circuit exactly from a density matrix simulation with the noise model,
+# instead of sampling its shots, when executing on the Aer simulator with noise, for circuits up to
+# exact_execution.max_density_matrix_qubits wide; wider circuits are sampled as usual
+density_matrix_execution = False
+
+# Option to keep a journal of the jobs launched on remote backends (see job_journal module)
+# so that they can be retrieved with resume_execution() if the program is interrupted
+use_job_journal = True
+
+# Identifier of the current run in the job journal, and the app (module of the result handler)
+journal_run_id = None
+journal_app = None
+
 # Print progress of execution
 verbose = False;
 
@@ -105,6 +192,31 @@ verbose_time = False;
 # Option to perform explicit transpile to collect depth metrics
 do_transpile_metrics = True
 
+# Option to cache transpiled circuits, in memory and on disk (see circuit_cache module)
+# so that repeated runs of identical circuits skip transpilation
+use_transpile_cache = False
+
+# Number of worker processes in the transpile stage, 0 = transpile serially when each job is launched
+# When > 0, circuits are transpiled in a process pool as they are submitted,
+# and each circuit is queued for execution as soon as its transpile is done
+max_transpile_workers = 0
+
+# Parameterized circuit templates from which circuits are submitted (see submit_circuit), keyed by id;
+# each is transpiled once, and the size metrics of the first circuit bound from it are used for all
+circuit_templates = {}
+
+# Process pool used for the transpile stage, created on first use
+transpile_pool = None
+transpile_pool_workers = 0
+
+# Option to transpile each circuit only once, for the backend, and use it both to obtain the
+# transpiled size metrics (tr_depth, tr_xi, tr_n2q) and as the circuit that is executed
+transpile_once = False
+
+# With transpile_once, option to also obtain the size metrics for the normalized basis gate set
+# (as without transpile_once); the metrics of the execution transpile are then stored as exec_tr_*
+do_normalized_metrics = False
+
 # Selection of basis gate set for transpilation
 # Note: selector 1 is a hardware agnostic gate set
 basis_selector = 1
@@ -122,10 +234,30 @@ basis_gates_array = [
 
 # Initialize the execution module, with a custom result handler
 def init_execution(handler):
-    global batched_circuits, result_handler
+    global batched_circuits, result_handler, backend
     batched_circuits.clear()
+    
+    # release the shared job slots held by any jobs left active
+    for job in active_circuits:
+        release_job_slot()
     active_circuits.clear()
+    pending_group_circuits.clear()
+    circuit_templates.clear()
+    job_completion_event.clear()
+    shutdown_transpile_pool()
+    concurrency.init_controller()
+    job_status.init_job_status()
     result_handler = handler
+    
+    if backend == None:
+        backend = get_default_backend()
+    
+    global journal_run_id, journal_app
+    journal_run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    journal_app = getattr(handler, "__module__", None)
+    
+    # the spans recorded when tracing are tagged with the app of the handler
+    tracing.set_app(journal_app)
 
 # Set the backend for execution
 def set_execution_target(backend_id='qasm_simulator',
@@ -141,6 +273,9 @@ def set_execution_target(backend_id='qasm_simulator',
     :param provider_name:  If using a provider other than IBMQ, the name of the provider class.
     For example, for Honeywell, this would be 'Honeywell'.
     :provider_backend: a custom backend object created and passed in, use backend_id as identifier
+    :param exec_options: dict of execution options, e.g. optimization_level, layout_method, routing_method,
+    transformer, noise_model; and for the Aer simulator, max_parallel_threads, max_parallel_experiments,
+    max_parallel_shots, method, fusion_enable, fusion_threshold and fusion_max_qubit
     example usage.
 
     set_execution_target(backend_id='honeywell_device_1', provider_module_name='qiskit.providers.honeywell',
@@ -155,7 +290,7 @@ def set_execution_target(backend_id='qasm_simulator',
     
     # handle QASM simulator specially
     elif backend_id == 'qasm_simulator':
-        backend = Aer.get_backend("qasm_simulator") 
+        backend = get_default_backend()
         
     # otherwise use the given backend_id to find the backend
     else:
@@ -170,6 +305,7 @@ def set_execution_target(backend_id='qasm_simulator',
                 print(authentication_error_msg.format(provider_name))
         else:
             # otherwise, assume IBMQ
+            from qiskit import IBMQ
             if IBMQ.stored_account():
                 # load a stored account
                 IBMQ.load_account()
@@ -188,6 +324,9 @@ def set_execution_target(backend_id='qasm_simulator',
     # save execute options with backend
     global backend_exec_options
     backend_exec_options = exec_options
+    
+    # bind the noise model to the simulator
+    build_noisy_backend()
 
 
 def set_noise_model(noise_model = None):
@@ -215,25 +354,164 @@ def set_noise_model(noise_model = None):
     ```
     """
     
-    global noise
+    global noise, use_default_noise
     noise = noise_model
+    use_default_noise = False
+    
+    # bind the noise model to the simulator
+    build_noisy_backend()
+
+# Return the Aer qasm_simulator, used by default
+def get_default_backend():
+    from qiskit import Aer
+    return Aer.get_backend("qasm_simulator")
+
+# Build the instance of the simulator backend with the noise model bound to it
+# Its basis gates are those of the noise model, so circuits are transpiled to them as with execute()
+# None is built if no backend is set yet; it is then built once the backend is set (see get_noisy_backend)
+def build_noisy_backend():
+    global noisy_backend, noisy_backend_source
+    
+    this_noise = get_noise_model()
+    noisy_backend_source = (backend, this_noise)
+    
+    if this_noise is None or not is_aer_backend():
+        noisy_backend = None
+        return
+        
+    # create a new instance with the options of the backend; a copy would share its options with
+    # the backend, which would then also execute with the noise model bound
+    noisy_backend = type(backend)(configuration=backend.configuration(),
+            properties=backend.properties(), provider=backend.provider())
+    noisy_backend.set_options(**backend.options.__dict__)
+    noisy_backend.set_options(noise_model=this_noise)
+    
+# Return the simulator backend with the noise model bound, or None if the noise model cannot be bound
+# It is rebuilt if the backend or noise model were changed without set_execution_target or set_noise_model
+def get_noisy_backend():
+    if noisy_backend_source[0] is not backend or noisy_backend_source[1] is not get_noise_model():
+        build_noisy_backend()
+    return noisy_backend
 
 ######################################################################
 # CIRCUIT EXECUTION METHODS
 
 # Submit circuit for execution
 # Execute immediately if possible or put into the list of batched circuits
-def submit_circuit(qc, group_id, circuit_id, shots=100):
-
+# A result handler may be given for this circuit, in place of the one passed to init_execution
+# The shots may be split into num_splits jobs, in place of the shot_splits option
+# If parameter values are given (a dict keyed by parameter, or a list in the order of qc.parameters),
+# qc is a parameterized template: it is transpiled once, and the circuit executed is the transpiled
+# template bound with the values; the result handler is given the template bound with the values,
+# and the size metrics are those of the first circuit bound from the template (see prepare_template_launch)
+# qc may instead be a function returning the circuit, called only when its job is launched, so that the
+# circuits waiting for a job slot are not held in memory (see create_circuit)
+def submit_circuit(qc, group_id, circuit_id, shots=100, handler=None, num_splits=None, parameter_values=None):
+
+    # bind the template with the parameter values, keeping the template to be prepared once
+    template = None
+    if parameter_values != None:
+        template = qc
+        if not isinstance(parameter_values, dict):
+            parameter_values = dict(zip(template.parameters, parameter_values))
+        qc = template.assign_parameters(parameter_values)
+        
     # create circuit object with submission time and circuit info
     circuit = { "qc": qc, "group": str(group_id), "circuit": str(circuit_id),
             "submit_time": time.time(), "shots": shots }
+    
+    if handler != None:
+        circuit["handler"] = handler
+        
+    # a circuit created by a function is created when launched; until then, the circuit is added
+    # to the metrics of its group, so the group is not complete before the circuit is executed
+    if callable(qc):
+        circuit["qc"] = None
+        circuit["factory"] = qc
+        metrics.add_circuit(group_id, circuit_id)
+        
+    # (not with a transformer, as the transformed circuits may not have the parameters of the template)
+    if template != None and not (backend_exec_options != None and "transformer" in backend_exec_options):
+        circuit["template"] = (template, parameter_values)
+        
+    # the benchmark decomposed the circuit after creating it, so record that span when tracing
+    tracing.record_decompose(group_id, circuit_id, circuit["submit_time"])
             
     if verbose:
         print(f'... submit circuit - group={circuit["group"]} id={circuit["circuit"]} shots={circuit["shots"]}')
+        
+    # if splitting the shots, queue a job for each part (not packed into group jobs, to execute them at the same time)
+    # only the first part is transpiled in the transpile stage, as the parts are prepared once for all
+    parts = split_circuit(circuit, num_splits)
+    if parts != None:
+        if verbose:
+            print(f"  ... split shots into {len(parts)} jobs")
+        if max_transpile_workers > 0 and template == None and "factory" not in circuit:
+            start_staged_transpile(parts[0])
+        for part in parts:
+            queue_job(part)
+        return
+    
+    # start transpiling the circuit in the transpile stage, if enabled
+    # (a template is transpiled once when launched, and a circuit created by a function is created when launched)
+    if max_transpile_workers > 0 and "template" not in circuit and "factory" not in circuit:
+        start_staged_transpile(circuit)
+    
+    # if packing circuits of a group into one job, hold the circuit until the group is complete
+    # (not done with a transformer, as it may produce multiple circuits from each circuit)
+    if batch_group_jobs and not (backend_exec_options != None and "transformer" in backend_exec_options):
+        
+        # a circuit from a different group (or with different shots) completes the pending group
+        if len(pending_group_circuits) > 0:
+            if (pending_group_circuits[0]["group"] != circuit["group"]
+                    or pending_group_circuits[0]["shots"] != circuit["shots"]):
+                flush_group_circuits()
+                
+        pending_group_circuits.append(circuit)
+        if verbose:
+            print("  ... added circuit to group job")
+        return
+    
+    queue_job(circuit)
+    
+# Return the circuits of the jobs into which the shots of a circuit are split, or None if not split
+# The shots are split into num_splits jobs (shot_splits if None), or more if needed to keep
+# each job within the maximum shots per job
+def split_circuit(circuit, num_splits=None):
+
+    shots = circuit["shots"]
+    num_parts = num_splits if num_splits != None else shot_splits
+    
+    max_shots = max_shots_per_job
+    if max_shots == None:
+        max_shots = getattr(backend.configuration(), "max_shots", None)
+    if max_shots != None and max_shots > 0:
+        num_parts = max(num_parts, -(-shots // max_shots))
+        
+    num_parts = min(num_parts, shots)
+    if num_parts <= 1:
+        return None
+    
+    # the parts share the state of the split, in which their results are collected
+    split = { "circuit": circuit, "num_parts": num_parts, "results": [], "exec_times": [],
+            "launch_time": None, "end_time": 0 }
+    
+    parts = []
+    for i in range(num_parts):
+        part = copy.copy(circuit)
+        part["shots"] = shots // num_parts + (1 if i < shots % num_parts else 0)
+        part["part"] = i
+        part["split"] = split
+        parts.append(part)
+        
+    return parts
     
-    # immediately post the circuit for execution if active jobs < max
-    if len(active_circuits) < max_jobs_active:
+# Queue a job for execution, either a single circuit or a group job containing multiple circuits
+# Execute immediately if active jobs < max, or put into the list of batched circuits
+def queue_job(circuit):
+    
+    # immediately post the circuit for execution if active jobs < max (and its transpile is done)
+    if len(active_circuits) < max_jobs_active and is_transpile_done(circuit) and acquire_job_slot():
         execute_circuit(circuit)
     
     # or just add it to the batch list for execution after others complete
@@ -242,213 +520,136 @@ def submit_circuit(qc, group_id, circuit_id, shots=100):
         if verbose:
             print("  ... added circuit to batch")
 
-# Launch execution of one job (circuit)
+# Submit the circuits held for the current group as one or more multi-circuit group jobs
+def flush_group_circuits():
+
+    if len(pending_group_circuits) < 1:
+        return
+        
+    circuits = list(pending_group_circuits)
+    pending_group_circuits.clear()
+    
+    # limit the number of circuits per job, if the backend or the user requires it
+    max_circuits = max_circuits_per_job
+    if max_circuits == None:
+        max_circuits = getattr(backend.configuration(), "max_experiments", None)
+    if max_circuits == None or max_circuits < 1:
+        max_circuits = len(circuits)
+    
+    for i in range(0, len(circuits), max_circuits):
+        group_circuits = circuits[i:i + max_circuits]
+        
+        # create group job object, containing the circuits it packs
+        group_job = { "group": group_circuits[0]["group"],
+                "circuit": ",".join([c["circuit"] for c in group_circuits]),
+                "submit_time": group_circuits[0]["submit_time"],
+                "shots": group_circuits[0]["shots"], "circuits": group_circuits }
+        
+        if verbose:
+            print(f'... submit group job - group={group_job["group"]} circuits={len(group_circuits)} shots={group_job["shots"]}')
+            
+        queue_job(group_job)
+        
+# Launch execution of one job (circuit, or group of circuits)
 def execute_circuit(circuit):
 
     active_circuit = copy.copy(circuit)
     active_circuit["launch_time"] = time.time()
     active_circuit["pollcount"] = 0 
     
-    shots = circuit["shots"]
+    # the job waited in the batch from submit until now, for a free job slot
+    tracing.record_span("queue", circuit["submit_time"], active_circuit["launch_time"],
+            circuit["group"], circuit["circuit"], lane=job_lane(circuit))
     
-    qc = circuit["qc"]
-    
-    # do the decompose before obtaining circuit metrics so we expand subcircuits to 2 levels
-    # Comment this out here; ideally we'd generalize it here, but it is intended only to 
-    # 'flatten out' circuits with subcircuits; we do it in the benchmark code for now so
-    # it only affects circuits with subcircuits (e.g. QFT, AE ...)
-    # qc = qc.decompose()
-    # qc = qc.decompose()
+    shots = circuit["shots"]
     
-    # obtain initial circuit size metrics
-    qc_depth = qc.depth()
-    qc_size = qc.size()
-    qc_count_ops = qc.count_ops()
-    qc_xi = 0
-
-    # iterate over the ordereddict to determine xi (ratio of 2 qubit gates to one qubit gates)
-    n1q = 0; n2q = 0
-    if qc_count_ops != None:
-        for key, value in qc_count_ops.items():
-            if key == "measure": continue
-            if key == "barrier": continue
-            if key.startswith("c") or key.startswith("mc"):
-                n2q += value
-            else:
-                n1q += value
-        qc_xi = n2q / (n1q + n2q)
-
-        # default the transpiled metrics to the same, in case exec fails
-    qc_tr_depth = qc_depth
-    qc_tr_size = qc_size
-    qc_tr_count_ops = qc_count_ops
-    qc_tr_xi = 0; 
-    qc_tr_n2q = 0
-    #print(f"... before tp: {qc_depth} {qc_size} {qc_count_ops}")
+    # a group job contains all the circuits to be executed in it; otherwise it is a single circuit
+    if "circuits" in circuit:
+        circuits = [copy.copy(c) for c in circuit["circuits"]]
+        active_circuit["circuits"] = circuits
+    else:
+        circuits = [active_circuit]
+        
+    # create the circuits submitted as functions, now that their job is launched
+    try:
+        for c in circuits:
+            create_circuit(c)
+            
+    except Exception as e:
+        launch_failed(active_circuit, circuits, e)
+        return
+        
+    # compute the exact result of the circuits, instead of launching a job
+    exact_method = get_exact_method(circuit)
+    if exact_method != None and launch_exact_result(active_circuit, circuits, exact_method):
+        return
+        
+    # use the cached result of the circuit if it has been executed before, instead of launching a job
+    if is_result_cacheable(circuit):
+        active_circuit["result_key"] = get_result_key(active_circuit)
+        entry = circuit_cache.load_result(active_circuit["result_key"])
+        if entry != None:
+            launch_cached_result(active_circuit, entry)
+            return
     
-    try:    
-        # transpile the circuit to obtain size metrics
-        if do_transpile_metrics:
+    try:
+        exec_circuits = []
+        for c in circuits:
         
-            #print("*** Before transpile ...")
-            #print(circuit["qc"])
-            st = time.time()
+            # the spans recorded while preparing the circuit are tagged with it
+            tracing.set_circuit(c["group"], c["circuit"])
             
-            # use either the backend or one of the basis gate sets
-            if basis_selector == 0:
-                qc = transpile(circuit["qc"], backend)
+            # the parts of a circuit whose shots are split into multiple jobs are prepared once, for all parts
+            if "split" in c:
+                if "prepared" not in c["split"]:
+                    c["split"]["prepared"] = (prepare_launch(c), c["size_metrics"])
+                (trans_qcs, transpiled), c["size_metrics"] = c["split"]["prepared"]
             else:
-                basis_gates = basis_gates_array[basis_selector]
-                qc = transpile(circuit["qc"], basis_gates=basis_gates,seed_transpiler=0)
+                trans_qcs, transpiled = prepare_launch(c)
             
-            if verbose_time:
-                print(f"*** normalization qiskit.transpile() time = {time.time() - st}")
-            #print(qc)
-                
-            qc_tr_depth = qc.depth()
-            qc_tr_size = qc.size()
-            qc_tr_count_ops = qc.count_ops()
-            #print(f"*** after transpile: {qc_tr_depth} {qc_tr_size} {qc_tr_count_ops}")
-            
-            # iterate over the ordereddict to determine xi (ratio of 2 qubit gates to one qubit gates)
-            n1q = 0; n2q = 0
-            if qc_tr_count_ops != None:
-                for key, value in qc_tr_count_ops.items():
-                    if key == "measure": continue
-                    if key == "barrier": continue
-                    if key.startswith("c"): n2q += value
-                    else: n1q += value
-                qc_tr_xi = n2q / (n1q + n2q) 
-                qc_tr_n2q = n2q   
-            #print(f"... qc_tr_xi = {qc_tr_xi} {n1q} {n2q}")
-        
-        # use noise model from execution options if given for simulator
-        this_noise = noise
-        if backend_exec_options != None and "noise_model" in backend_exec_options:
-            this_noise = backend_exec_options["noise_model"]
-            #print(f"... using custom noise model: {this_noise}")
-            
-        # Initiate execution (with noise if specified and this is a simulator backend)
-        if this_noise is not None and backend.name().endswith("qasm_simulator"):
-            #print("... performing simulation")
-            
-            simulation_circuits = circuit["qc"]
-            
-            # use execution options if set for simulator
-            if backend_exec_options != None:
-            
-                # apply transformer pass if provided
-                if "transformer" in backend_exec_options:
-                    #print("... applying transformer to sim!")
-                    st = time.time()
-                    trans_qc = transpile(circuit["qc"], backend)
-                    simulation_circuits = backend_exec_options["transformer"](trans_qc, backend=backend)
-                    
-                    # if transformer results in multiple circuits, divide shot count
-                    # results will be accumulated in job_complete
-                    # NOTE: this will need to set a flag to distinguish from multiple circuit execution 
-                    if len(simulation_circuits) > 1:
-                        shots = int(shots / len(simulation_circuits))
-                    
-                    if verbose_time:
-                        print(f"  *** transformer() time = {time.time() - st}")
-       
-            # for noisy simulator, use execute() which works; it is unclear from docs
-            # whether noise_model should be passed to transpile() or run() 
-            st = time.time()
-            job = execute(simulation_circuits, backend, shots=shots,
-                noise_model=this_noise, basis_gates=this_noise.basis_gates)
-                
-            if verbose_time:
-                    print(f"  *** qiskit.execute() time = {time.time() - st}")
-                
-        # Initiate excution for all other backends and noiseless simulator
-        else:
-            #print(f"... executing on backend: {backend.name()}")
+            # if transformer results in multiple circuits, divide shot count
+            # results will be accumulated in job_complete
+            # NOTE: this will need to set a flag to distinguish from multiple circuit execution
+            c["num_experiments"] = len(trans_qcs)
+            if len(trans_qcs) > 1:
+                shots = int(shots / len(trans_qcs))
             
-            # use execution options if set for backend
-            if backend_exec_options != None:
-                        
-                optimization_level = 1
-                if "optimization_level" in backend_exec_options: 
-                    optimization_level = backend_exec_options["optimization_level"]
-                
-                layout_method = None
-                if "layout_method" in backend_exec_options: 
-                    layout_method = backend_exec_options["layout_method"]
-                
-                routing_method = None
-                if "routing_method" in backend_exec_options: 
-                    routing_method = backend_exec_options["routing_method"]
-                
-                #job = execute(circuit["qc"], backend, shots=shots,
-                
-                # the 'execute' method includes transpile, use transpile + run instead (to enable time metrics)
-                st = time.time()
-                trans_qc = transpile(circuit["qc"], backend, 
-                    optimization_level=optimization_level,
-                    layout_method=layout_method,
-                    routing_method=routing_method)
-                    
-                if verbose_time:
-                    print(f"  *** qiskit.transpile() time = {time.time() - st}")
-                
-                # apply transformer pass if provided
-                if "transformer" in backend_exec_options:
-                    st = time.time()
-                    #print("... applying transformer!")
-                    trans_qc2 = backend_exec_options["transformer"](trans_qc, backend)
-                    trans_qc = trans_qc2
-                
-                    # if transformer results in multiple circuits, divide shot count
-                    # results will be accumulated in job_complete
-                    # NOTE: this will need to set a flag to distinguish from multiple circuit execution 
-                    if len(trans_qc) > 1:
-                        shots = int(shots / len(trans_qc))
-                    
-                    if verbose_time:
-                        print(f"  *** transformer() time = {time.time() - st}")
-                
-                st = time.time()                
-                job = backend.run(trans_qc, shots=shots)
-                
-                if verbose_time:
-                    print(f"  *** qiskit.run() time = {time.time() - st}")
-                    
-            # execute with no options set
-            else:
-                st = time.time()
-                job = execute(circuit["qc"], backend, shots=shots)
-                
-                if verbose_time:
-                    print(f"  *** qiskit.execute() time = {time.time() - st}")
-                
-            # there appears to be no reason to do transpile, as it is done automatically
-            # DEVNOTE: this prevents us from measuring transpile time
-            # If we use this method, we'd need to validate on all backends again, so leave for now
-            #qc = transpile(circuit["qc"], backend)
-            #job = execute(qc, backend, shots=shots)
+            exec_circuits.extend(trans_qcs)
+            
+        tracing.set_circuit(None, None)
+            
+        # a single circuit is executed on its own, not as a list
+        if len(exec_circuits) == 1:
+            exec_circuits = exec_circuits[0]
+            
+        # each part of a split circuit is executed with its own seed, if the seed is fixed
+        with tracing.span("submit", active_circuit["group"], active_circuit["circuit"]):
+            job = run_circuits(exec_circuits, shots, transpiled, seed_offset=active_circuit.get("part", 0))
             
     except Exception as e:
-        print(f'ERROR: Failed to execute circuit {active_circuit["group"]} {active_circuit["circuit"]}')
-        print(f"... exception = {e}")
+        tracing.set_circuit(None, None)
+        launch_failed(active_circuit, circuits, e)
         return
     
     # print("Job status is ", job.status() )
     
     # put job into the active circuits with circuit info
     active_circuits[job] = active_circuit
+    
+    # signal completion through the job's future if it has one, otherwise the job is polled
+    active_circuit["has_future"] = register_completion_callback(job)
     # print("... active_circuit = ", str(active_circuit))
 
     # store circuit dimensional metrics
-    metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'depth', qc_depth)
-    metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'size', qc_size)
-    metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'xi', qc_xi)
-
-    metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'tr_depth', qc_tr_depth)
-    metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'tr_size', qc_tr_size)
-    metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'tr_xi', qc_tr_xi)
-    metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'tr_n2q', qc_tr_n2q)
+    for c in circuits:
+        for metric, value in c["size_metrics"].items():
+            metrics.store_metric(c["group"], c["circuit"], metric, value)
+            
+    # record the job in the journal, with the metrics stored so far
+    # (not the parts of a split circuit, as their results could not be merged when resumed)
+    if is_journaled() and "split" not in active_circuit:
+        job_journal.record_launch(job.job_id(), get_backend_name(), journal_run_id, journal_app,
+                active_circuit["launch_time"], circuits, "circuits" in active_circuit, metrics.circuit_metrics)
     
     # return, so caller can do other things while waiting for jobs to complete
 
@@ -463,25 +664,550 @@ def execute_circuit(circuit):
     '''
     if verbose:
         print(f"... executing job {job.job_id()}")
+        
+# Report the failure to launch a job, releasing its job slot
+def launch_failed(active_circuit, circuits, e):
+    print(f'ERROR: Failed to execute circuit {active_circuit["group"]} {active_circuit["circuit"]}')
+    print(f"... exception = {e}")
+    release_job_slot()
+    update_jobs_active(circuits, len(active_circuits) + 1, failed=True)
+    
+    # a split circuit has no result if one of its parts fails to launch
+    if "split" in active_circuit:
+        circuit_complete(active_circuit, None, time.time() - active_circuit["launch_time"], {})
+        
+# Create the circuit of a circuit submitted as a function, if not created yet, by calling the function
+# The parts of a split circuit share the circuit, created for the first part launched
+def create_circuit(c):
+
+    if c["qc"] != None:
+        return
+        
+    source = c["split"]["circuit"] if "split" in c else c
+    if source["qc"] == None:
+        source["qc"] = source["factory"]()
+        
+        # the function creates and decomposes the circuit, so record the decompose span as on submit
+        tracing.record_decompose(source["group"], source["circuit"], time.time())
+        
+    c["qc"] = source["qc"]
+    
+# Obtain the size metrics of a circuit, stored with it, and the circuits to execute for it
+# Returns a list of circuits to be executed, and whether they have been transpiled for execution
+def prepare_launch(c):
+    
+    # a circuit bound from a template is prepared from the template, prepared once for all its circuits
+    if "template" in c:
+        return prepare_template_launch(c)
+        
+    # obtain the circuits transpiled in the transpile stage, if done there
+    metrics_trans_qc, exec_trans_qc = get_staged_transpile(c)
+    
+    c["size_metrics"], exec_trans_qc = get_launch_metrics(c["qc"], metrics_trans_qc, exec_trans_qc)
+    
+    # obtain the circuits to execute, after applying the execution options
+    return prepare_circuit(c["qc"], exec_trans_qc)
+    
+# Obtain the size metrics of a circuit being launched, from the circuits transpiled for the metrics
+# and for execution, if given; returns the metrics, and the circuit transpiled for execution if any
+def get_launch_metrics(qc, metrics_trans_qc=None, exec_trans_qc=None):
+    
+    # when transpiling once, the circuit transpiled for execution provides the size metrics
+    if transpile_once:
+        if exec_trans_qc == None:
+            exec_trans_qc = transpile_for_execution(qc)
+            
+        size_metrics = get_circuit_metrics(qc, exec_trans_qc)
+        
+        # normalized basis metrics are stored as tr_*, the execution metrics as exec_tr_*
+        if do_normalized_metrics:
+            size_metrics.update(get_transpiled_metrics(exec_trans_qc, prefix="exec_tr_"))
+            size_metrics.update(get_circuit_metrics(qc, metrics_trans_qc))
+    
+    # obtain the size metrics of the circuit, before and after transpile
+    else:
+        size_metrics = get_circuit_metrics(qc, metrics_trans_qc)
+    
+    return size_metrics, exec_trans_qc
+    
+# Obtain the size metrics of a circuit bound from a template, and the circuits to execute for it,
+# bound from the template's circuits, which are transpiled for execution on its first launch
+# The size metrics are those of the first circuit bound from the template, for all its circuits:
+# the transpiler simplifies gates whose parameters are bound (e.g. a rotation by 0 is removed), so
+# the metrics of the unbound template would be larger (e.g. for QFT method 2 at 2 qubits,
+# tr_depth 11 and tr_xi 0.143, in place of 8 and 0.262)
+def prepare_template_launch(c):
+
+    template_qc, parameter_values = c["template"]
+    
+    entry = circuit_templates.get(id(template_qc))
+    if entry == None or entry["qc"] is not template_qc:
+        entry = { "qc": template_qc }
+        entry["size_metrics"], _ = get_launch_metrics(c["qc"])
+        trans_qcs, transpiled = prepare_circuit(template_qc)
+        
+        # the template is always transpiled, so that it is not transpiled again for each circuit
+        if not transpiled:
+            transpile_args = exec_transpile_args(explicit=True)
+            with tracing.span("transpile"):
+                trans_qcs = [transpile_circuit(qc, transpile_args[0], **transpile_args[1]) for qc in trans_qcs]
+                
+        entry["trans_qcs"] = trans_qcs
+        circuit_templates[id(template_qc)] = entry
+        
+        if verbose:
+            print(f'... prepared template for circuit {c["group"]} {c["circuit"]}')
+            
+    c["size_metrics"] = dict(entry["size_metrics"])
+    
+    # parameters may be removed from the transpiled circuits, so bind only those remaining
+    exec_qcs = []
+    for trans_qc in entry["trans_qcs"]:
+        exec_qc = trans_qc.assign_parameters({ param: value for param, value in parameter_values.items()
+                if param in trans_qc.parameters })
+        
+        # the result is looked up by the name of the circuit given to the result handler
+        exec_qc.name = c["qc"].name
+        exec_qcs.append(exec_qc)
+            
+    return exec_qcs, True
+    
+# Obtain the size metrics of a circuit, and of the circuit transpiled to the selected basis
+# The transpiled circuit may be passed in, if it was transpiled already
+# Returns a dict of metric values, keyed by metric name
+def get_circuit_metrics(qc, trans_qc=None):
+    
+    # do the decompose before obtaining circuit metrics so we expand subcircuits to 2 levels
+    # Comment this out here; ideally we'd generalize it here, but it is intended only to 
+    # 'flatten out' circuits with subcircuits; we do it in the benchmark code for now so
+    # it only affects circuits with subcircuits (e.g. QFT, AE ...)
+    # qc = qc.decompose()
+    # qc = qc.decompose()
+    
+    # obtain initial circuit size metrics, in one pass over the circuit
+    # xi is the ratio of gates on 2 or more qubits to all gates
+    qc_stats = circuit_stats.get_circuit_stats(qc)
+    qc_depth = qc_stats["depth"]
+    qc_size = qc_stats["size"]
+    qc_xi = qc_stats["xi"]
+
+    # default the transpiled metrics to the same, in case exec fails
+    circuit_metrics = { "depth": qc_depth, "size": qc_size, "xi": qc_xi,
+            "tr_depth": qc_depth, "tr_size": qc_size, "tr_xi": 0, "tr_n2q": 0 }
+    #print(f"... before tp: {qc_depth} {qc_size} {qc_stats['count_ops']}")
+    
+    # transpile the circuit to obtain size metrics
+    if trans_qc == None:
+        transpile_args = metrics_transpile_args()
+        if transpile_args != None:
+            #print("*** Before transpile ...")
+            #print(qc)
+            st = time.time()
+            with tracing.span("metrics-transpile"):
+                trans_qc = transpile_circuit(qc, transpile_args[0], **transpile_args[1])
+            
+            if verbose_time:
+                print(f"*** normalization qiskit.transpile() time = {time.time() - st}")
+            #print(trans_qc)
+                
+    if trans_qc != None:
+        circuit_metrics.update(get_transpiled_metrics(trans_qc))
+        
+    return circuit_metrics
+    
+# Obtain the size metrics of a transpiled circuit, with metric names starting with the given prefix
+def get_transpiled_metrics(qc, prefix="tr_"):
+    
+    # xi is the ratio of gates on 2 or more qubits to all gates, n2q the number of those gates
+    qc_tr_stats = circuit_stats.get_circuit_stats(qc)
+    #print(f"*** after transpile: {qc_tr_stats['depth']} {qc_tr_stats['size']} {qc_tr_stats['count_ops']}")
+    
+    return { prefix + "depth": qc_tr_stats["depth"], prefix + "size": qc_tr_stats["size"],
+            prefix + "xi": qc_tr_stats["xi"], prefix + "n2q": qc_tr_stats["n2q"] }
+            
+# Return the noise model to use for simulation, or None if not executing on a simulator with noise
+# (or if no backend is set yet, as when the noise model is set before the execution target)
+def get_noise_model():
+    global noise, use_default_noise
+    
+    # create the default noise model, if not set
+    if use_default_noise:
+        noise = default_noise_model()
+        use_default_noise = False
+
+    # use noise model from execution options if given for simulator
+    this_noise = noise
+    if backend_exec_options != None and "noise_model" in backend_exec_options:
+        this_noise = backend_exec_options["noise_model"]
+        #print(f"... using custom noise model: {this_noise}")
+    
+    if this_noise is not None and backend is not None and backend.name().endswith("qasm_simulator"):
+        return this_noise
+    
+    return None
+    
+# Return the backend and transpile options for the transpile used to obtain size metrics,
+# either the backend or one of the basis gate sets, or None if not doing the metrics transpile
+def metrics_transpile_args():
+
+    if not do_transpile_metrics:
+        return None
+        
+    # when transpiling once, the metrics are obtained from the execution transpile
+    if transpile_once and not do_normalized_metrics:
+        return None
+        
+    if basis_selector == 0:
+        return backend, {}
+        
+    basis_gates = basis_gates_array[basis_selector]
+    return None, { "basis_gates": basis_gates, "seed_transpiler": 0 }
+
+# Return the backend and transpile options for the transpile done to prepare a circuit for execution,
+# or None if the transpile is left to qiskit.execute(), unless an explicit transpile is required
+def exec_transpile_args(explicit=False):
+
+    # transpile explicitly (not in qiskit.execute()) when it can be cached or done in the transpile stage
+    explicit_transpile = explicit or use_transpile_cache or max_transpile_workers > 0 or transpile_once
+    
+    this_noise = get_noise_model()
+    
+    # for noisy simulation, qiskit.execute() transpiles with the noise model basis gates
+    if this_noise is not None:
+    
+        # transformer pass is applied to the circuit transpiled for the simulator
+        if backend_exec_options != None and "transformer" in backend_exec_options:
+            return backend, {}
+            
+        # otherwise, do the same transpile as qiskit.execute()
+        if explicit_transpile:
+            return backend, { "basis_gates": this_noise.basis_gates }
+            
+        return None
+    
+    # for all other backends and noiseless simulator, use execution options if set for backend
+    if backend_exec_options != None:
+                
+        optimization_level = 1
+        if "optimization_level" in backend_exec_options: 
+            optimization_level = backend_exec_options["optimization_level"]
+        
+        layout_method = None
+        if "layout_method" in backend_exec_options: 
+            layout_method = backend_exec_options["layout_method"]
+        
+        routing_method = None
+        if "routing_method" in backend_exec_options: 
+            routing_method = backend_exec_options["routing_method"]
+            
+        return backend, { "optimization_level": optimization_level,
+                "layout_method": layout_method, "routing_method": routing_method }
+                
+    # with no options set, do the same transpile as qiskit.execute()
+    if explicit_transpile:
+        return backend, {}
+        
+    return None
+    
+# Prepare a circuit for execution, applying the transpile and transformer execution options
+# The circuit transpiled for execution may be passed in, if it was transpiled already
+# Returns a list of circuits to be executed, as a transformer may produce multiple circuits,
+# and whether the circuits have been transpiled for execution on the backend
+def prepare_circuit(qc, trans_qc=None):
+
+    # with no transpile required, qiskit.execute() does the transpile
+    transpile_args = exec_transpile_args()
+    if transpile_args == None:
+        return [qc], False
+        
+    # the 'execute' method includes transpile, use transpile + run instead (to enable time metrics)
+    if trans_qc == None:
+        trans_qc = transpile_for_execution(qc)
+    
+    # apply transformer pass if provided
+    if backend_exec_options != None and "transformer" in backend_exec_options:
+        st = time.time()
+        #print("... applying transformer!")
+        with tracing.span("transformer"):
+            trans_qcs = as_circuit_list(backend_exec_options["transformer"](trans_qc, backend))
+        
+        if verbose_time:
+            print(f"  *** transformer() time = {time.time() - st}")
+            
+        # for noisy simulation, the transformed circuits are transpiled in qiskit.execute()
+        return trans_qcs, get_noise_model() is None
+        
+    return [trans_qc], True
+    
+# Transpile a circuit for execution on the backend, with the execution options
+def transpile_for_execution(qc):
+    
+    transpile_args = exec_transpile_args()
+    
+    st = time.time()
+    with tracing.span("transpile"):
+        trans_qc = transpile_circuit(qc, transpile_args[0], **transpile_args[1])
+    
+    if verbose_time:
+        print(f"  *** qiskit.transpile() time = {time.time() - st}")
+        
+    return trans_qc
+    
+# Transpile a circuit, using the cache of transpiled circuits if enabled
+def transpile_circuit(qc, backend=None, **kwargs):
+    if use_transpile_cache:
+        return circuit_cache.transpile(qc, backend, **kwargs)
+    return transpile(qc, backend, **kwargs)
+    
+# A transformer may return either a single circuit or a list of circuits; return as a list
+def as_circuit_list(qcs):
+    if isinstance(qcs, QuantumCircuit):
+        return [qcs]
+    return list(qcs)
+    
+# Initiate execution of a circuit, or a list of circuits as one job, with noise if specified
+# and this is a simulator backend.  Returns the job.
+# If the circuits have been transpiled already, they are run directly on the backend
+# The seed_offset is added to a fixed simulator seed, to give each part of a split circuit its own seed
+def run_circuits(circuits, shots, transpiled=False, seed_offset=0):
+
+    this_noise = get_noise_model()
+    
+    # options for the parallelization and method of the simulator
+    run_options = simulator_run_options(seed_offset)
+    
+    # for noisy simulator, use execute() which works; it is unclear from docs
+    # whether noise_model should be passed to transpile() or run() 
+    if this_noise is not None:
+        st = time.time()
+        
+        # use the simulator with the noise model bound, if it could be built
+        sim_backend = get_noisy_backend()
+        if sim_backend != None:
+            if transpiled:
+                job = sim_backend.run(circuits, shots=shots, **run_options)
+            else:
+                job = execute(circuits, sim_backend, shots=shots, **run_options)
+                
+        elif transpiled:
+            job = backend.run(circuits, shots=shots, noise_model=this_noise, **run_options)
+        else:
+            job = execute(circuits, backend, shots=shots,
+                noise_model=this_noise, basis_gates=this_noise.basis_gates, **run_options)
+            
+        if verbose_time:
+            print(f"  *** qiskit.execute() time = {time.time() - st}")
+            
+    # circuits have been transpiled already if execution options are set for backend
+    elif transpiled:
+        #print(f"... executing on backend: {backend.name()}")
+        st = time.time()                
+        job = backend.run(circuits, shots=shots, **run_options)
+        
+        if verbose_time:
+            print(f"  *** qiskit.run() time = {time.time() - st}")
+            
+    # execute with no options set
+    else:
+        st = time.time()
+        job = execute(circuits, backend, shots=shots, **run_options)
+        
+        if verbose_time:
+            print(f"  *** qiskit.execute() time = {time.time() - st}")
+        
+    # there appears to be no reason to do transpile, as it is done automatically
+    # DEVNOTE: this prevents us from measuring transpile time
+    # If we use this method, we'd need to validate on all backends again, so leave for now
+    #qc = transpile(circuit["qc"], backend)
+    #job = execute(qc, backend, shots=shots)
+    
+    return job
+
+# Return the options for running a job on the Aer simulator, from the execution options,
+# or an empty dict for other backends
+def simulator_run_options(seed_offset=0):
+
+    if not is_aer_backend():
+        return {}
+        
+    run_options = {}
+    if backend_exec_options != None:
+        for name in simulator_option_names:
+            if name in backend_exec_options:
+                run_options[name] = backend_exec_options[name]
+    
+    # each job uses its share of the cores, as up to max_jobs_active jobs execute at the same time
+    if divide_parallel_threads and "max_parallel_threads" not in run_options:
+        run_options["max_parallel_threads"] = max((os.cpu_count() or 1) // max(max_jobs_active, 1), 1)
+        
+    # the results are cached only if reproducible, so use a fixed seed
+    if seed_simulator != None:
+        run_options["seed_simulator"] = seed_simulator + seed_offset
+    elif use_result_cache:
+        run_options["seed_simulator"] = seed_offset
+        
+    return run_options
+    
+# Return True if the backend is an Aer simulator
+def is_aer_backend():
+    module = type(backend).__module__
+    return module.startswith("qiskit.providers.aer") or module.startswith("qiskit_aer")
+
+# Return True if the result of executing the circuit can be cached
+# Only single circuit jobs on the Aer simulator are cached, without a transformer, as it cannot be identified
+def is_result_cacheable(circuit):
+    return (use_result_cache and "circuits" not in circuit and is_aer_backend()
+            and not (backend_exec_options != None and "transformer" in backend_exec_options))
+            
+# Return the key in the result cache for the result of executing the circuit
+# The key covers the circuit, backend, noise model, shots, seed and the options for execution
+# and for the size metrics, which are cached with the result
+def get_result_key(circuit):
+
+    this_noise = get_noise_model()
+    exec_args = exec_transpile_args()
+    metrics_args = metrics_transpile_args()
+    
+    # the number of threads does not change the result, and may vary with the number of active jobs
+    run_options = { name: value for name, value in simulator_run_options(circuit.get("part", 0)).items()
+            if not name.startswith("max_parallel") }
+    
+    execution = { "backend": get_backend_name(),
+            "noise_model": serialized_noise_model(this_noise) if this_noise is not None else None,
+            "shots": circuit["shots"],
+            "run_options": run_options,
+            "exec_transpile": exec_args[1] if exec_args != None else None,
+            "metrics_transpile": metrics_args[1] if metrics_args != None else None,
+            "transpile_once": transpile_once, "do_normalized_metrics": do_normalized_metrics }
+            
+    # a circuit bound from a template executes the bound transpiled template, not its own transpile
+    if "template" in circuit:
+        execution["template"] = True
+        
+    return circuit_cache.result_key(circuit["qc"], execution)
+    
+# Return the serialized form of a noise model, without the random ids assigned to its errors
+def serialized_noise_model(noise_model):
+    noise_dict = noise_model.to_dict(serializable=True)
+    for error in noise_dict.get("errors", []):
+        error.pop("id", None)
+    return noise_dict
+    
+# Make a circuit active with its result obtained from the result cache, as a job that is already done
+def launch_cached_result(active_circuit, entry):
+
+    job = CachedResultJob(Result.from_dict(entry["result"]))
+    
+    active_circuit["size_metrics"] = entry["size_metrics"]
+    active_circuit["cached_elapsed_time"] = entry["elapsed_time"]
+    active_circuit["has_future"] = False
+    active_circuits[job] = active_circuit
+    
+    for metric, value in active_circuit["size_metrics"].items():
+        metrics.store_metric(active_circuit["group"], active_circuit["circuit"], metric, value)
+    
+    # the job is done, so wake up the waiting loop to process it
+    job_completion_event.set()
+    
+    if verbose:
+        print(f'... using cached result for circuit {active_circuit["group"]} {active_circuit["circuit"]}')
+        
+# A job whose result was obtained from the result cache (or computed exactly), so has no job launched on the backend
+class CachedResultJob:
 
+    def __init__(self, result, prefix="cached"):
+        self._result = result
+        self.prefix = prefix
+        
+    def job_id(self):
+        return f"{self.prefix}-{id(self)}"
+        
+    def status(self):
+        return JobStatus.DONE
+        
+    def result(self):
+        return self._result
+
+# Return the method by which the circuits of the job can be executed exactly, or None if they are sampled:
+# "exact" from their statevector with no noise, "density_matrix" with the noise model; not with a transformer
+def get_exact_method(circuit):
+    if not is_aer_backend() or (backend_exec_options != None and "transformer" in backend_exec_options):
+        return None
+        
+    if get_noise_model() is None:
+        return "exact" if exact_execution else None
+        
+    return "density_matrix" if density_matrix_execution else None
+            
+# Make a job active with the exact result of its circuits computed by the given method, as a job that is done
+# Returns False if any of the circuits cannot be computed exactly, so the job is to be launched as usual
+def launch_exact_result(active_circuit, circuits, method):
+    import exact_execution
+    
+    experiments = []
+    for c in circuits:
+        st = time.time()
+        with tracing.span(method, c["group"], c["circuit"]):
+            if method == "density_matrix":
+                counts = exact_execution.get_noisy_counts(c["qc"], c["shots"], get_noise_model())
+            else:
+                counts = exact_execution.get_exact_counts(c["qc"], c["shots"])
+            
+        if counts == None:
+            if verbose:
+                print(f'... circuit {c["group"]} {c["circuit"]} cannot be executed exactly, sampling it')
+            for member in circuits:
+                metrics.store_metric(member["group"], member["circuit"], 'exec_method', "sampling")
+            return False
+            
+        experiments.append((c["qc"], counts, c["shots"], time.time() - st))
+        
+    # obtain the size metrics of the circuits, as when launching them
+    for c in circuits:
+        tracing.set_circuit(c["group"], c["circuit"])
+        prepare_launch(c)
+        c["num_experiments"] = 1
+        for metric, value in c["size_metrics"].items():
+            metrics.store_metric(c["group"], c["circuit"], metric, value)
+        metrics.store_metric(c["group"], c["circuit"], 'exec_method', method)
+    tracing.set_circuit(None, None)
+        
+    job = CachedResultJob(exact_execution.build_result(experiments, get_backend_name(), method, method), prefix=method)
+    
+    active_circuit["has_future"] = False
+    active_circuits[job] = active_circuit
+    
+    # the job is done, so wake up the waiting loop to process it
+    job_completion_event.set()
+    
+    return True
+    
 # Process a completed job
-def job_complete(job):
+# The job status may be passed in if already known, to avoid querying it again
+def job_complete(job, status=None):
     active_circuit = active_circuits[job]
     
     if verbose:
         print(f'\n... job complete - group={active_circuit["group"]} id={active_circuit["circuit"]} shots={active_circuit["shots"]}')
     
     # compute elapsed time for circuit; assume exec is same, unless obtained from result
+    # for a cached result, this is the elapsed time when it was executed
     elapsed_time = time.time() - active_circuit["launch_time"]
+    if "cached_elapsed_time" in active_circuit:
+        elapsed_time = active_circuit["cached_elapsed_time"]
     
-    # report exec time as 0 unless valid measure returned
-    exec_time = 0.0
-
     # get job result (DEVNOTE: this might be different for diff targets)
     result = None
+    
+    # breakdown of execution time, if available
+    exec_step_times = {}
+    
+    if status is None:
+        status = job.status()
         
-    if job.status() == JobStatus.DONE:
-        result = job.result()
+    if status == JobStatus.DONE:
+        with tracing.span("result", active_circuit["group"], active_circuit["circuit"]):
+            result = job.result()
         # print("... result = ", str(result))
         
         # get breakdown of execution time, if method exists 
@@ -493,10 +1219,10 @@ def job_complete(job):
             exec_queued_time = (time_per_step["RUNNING"] - time_per_step["QUEUED"]).total_seconds()
             exec_running_time = (time_per_step["COMPLETED"] - time_per_step["RUNNING"]).total_seconds()
             
-            metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'exec_creating_time', exec_creating_time)
-            metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'exec_validating_time', exec_validating_time)
-            metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'exec_queued_time', exec_queued_time)
-            metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'exec_running_time', exec_running_time)
+            exec_step_times = { 'exec_creating_time': exec_creating_time,
+                    'exec_validating_time': exec_validating_time,
+                    'exec_queued_time': exec_queued_time,
+                    'exec_running_time': exec_running_time }
             
         else: 
             time_per_step = {}
@@ -508,66 +1234,123 @@ def job_complete(job):
         #print("... time_per_step = ", str(time_per_step))
         if verbose:
             print(f"... exec times, creating = {exec_creating_time}, validating = {exec_validating_time}, queued = {exec_queued_time}, running = {exec_running_time}")        
+    
+    # remove from list of active circuits
+    num_active = len(active_circuits)
+    del active_circuits[job]
+    release_job_slot()
+
+    # for a group job, split the result into the results for each of its circuits
+    if "circuits" in active_circuit:
+        circuits = active_circuit["circuits"]
+        exec_time = 0
+        start = 0
+        for circuit in circuits:
+            num_experiments = circuit["num_experiments"]
+            circuit_result = None
+            if result != None:
+                circuit_result = split_result(result, start, num_experiments)
+            start += num_experiments
+            
+            exec_time += circuit_complete(circuit, circuit_result, elapsed_time, exec_step_times, group_job=True)
+            
+    else:
+        circuits = [active_circuit]
+        exec_time = circuit_complete(active_circuit, result, elapsed_time, exec_step_times)
+        
+    # save the result of an executed circuit in the result cache
+    if result != None and "result_key" in active_circuit and "cached_elapsed_time" not in active_circuit:
+        circuit_cache.save_result(active_circuit["result_key"], { "result": result.to_dict(),
+                "size_metrics": active_circuit["size_metrics"], "elapsed_time": elapsed_time })
+        
+    # the concurrency is adapted to jobs executed on the backend, not to cached results
+    if "cached_elapsed_time" not in active_circuit:
+        update_jobs_active(circuits, num_active, elapsed_time, exec_time, failed=(result == None))
+    journal_job_complete(job, circuits)
+    
+    tracing.record_span("run", active_circuit["launch_time"], active_circuit["launch_time"] + elapsed_time,
+            active_circuit["group"], active_circuit["circuit"], lane=job_lane(active_circuit),
+            job_id=job.job_id(), exec_time=exec_time, failed=(result == None),
+            cached=("cached_elapsed_time" in active_circuit))
+
+# Return the lane in which the spans of a job are shown in the trace, one for each job
+def job_lane(circuit):
+    if "part" in circuit:
+        return f'job {circuit["group"]}/{circuit["circuit"]}.{circuit["part"]}'
+    return f'job {circuit["group"]}/{circuit["circuit"]}'
+
+# Return a copy of a result object, containing only the given range of experiment results
+def split_result(result, start, count):
+    circuit_result = copy.copy(result)
+    circuit_result.results = result.results[start:start + count]
+    return circuit_result
+
+# Process the result of a completed circuit, store its metrics and invoke the result handler
+# For a circuit executed in a group job, obtain the execution time of its own experiments
+def circuit_complete(active_circuit, result, elapsed_time, exec_step_times, group_job=False):
+
+    # a part of a split circuit is collected, until the results of all its parts can be merged
+    if "split" in active_circuit:
+        return split_part_complete(active_circuit, result, elapsed_time, exec_step_times)
+        
+    # store the breakdown of execution time, if available
+    for metric, value in exec_step_times.items():
+        metrics.store_metric(active_circuit["group"], active_circuit["circuit"], metric, value)
+
+    # report exec time as 0 unless valid measure returned
+    exec_time = 0.0
+    
+    if result != None:
 
         # counts = result.get_counts(qc)
         # print("Total counts are:", counts)
         
-        # obtain timing info from the results object
-        result_obj = result.to_dict()
-        results_obj = result.to_dict()['results'][0]
-        #print(f"result_obj = {result_obj}")
-        #print(f"results_obj = {results_obj}")
-        #print(f'shots = {results_obj["shots"]}')
+        # obtain the shots and timing info directly from the result objects,
+        # as converting the result to a dict copies all of the counts
         
         # get the actual shots and convert to int if it is a string
         actual_shots = 0
-        for experiment in result_obj["results"]:
-            actual_shots += experiment["shots"]
-            
-        if type(actual_shots) is str:
-            actual_shots = int(actual_shots)
+        for experiment in result.results:
+            actual_shots += int(experiment.shots)
         
         if actual_shots != active_circuit["shots"]:
             print(f'WARNING: requested shots not equal to actual shots: {active_circuit["shots"]} != {actual_shots} ')
         
-        if "time_taken" in result_obj:
-            exec_time = result_obj["time_taken"]
-        
-        elif "time_taken" in results_obj:
-            exec_time = results_obj["time_taken"]
-    
-    # remove from list of active circuits
-    del active_circuits[job]
+        exec_time = get_exec_time(result, group_job)
 
     metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'elapsed_time', elapsed_time)
     metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'exec_time', exec_time)
 
+    # use the result handler given with the circuit, if any
+    handler = active_circuit.get("handler", result_handler)
+    
     # If a result handler has been established, invoke it here with result object
-    if result != None and result_handler:
+    if result != None and handler:
     
         # The following computes the counts by summing them up, allowing for the case where
         # <result> contains results from multiple circuits
         # DEVNOTE: This will need to change; currently the only case where we have multiple result counts
         # is when using randomly_compile; later, there will be other cases
-        if type(result.get_counts()) == list:
-            total_counts = dict()
-            for count in result.get_counts():
-                total_counts = dict(Counter(total_counts) + Counter(count))
+        if len(result.results) > 1:
+            total_counts = merge_counts(result.results)
                 
             # make a copy of the result object so we can return a modified version
             orig_result = result
             result = copy.copy(result) 
 
             # replace the results array with an array containing only the first results object
-            # then populate other required fields
+            # then populate other required fields (copied, as they are shared with the original result)
             results = copy.copy(result.results[0])
+            results.header = copy.copy(results.header)
             results.header.name = active_circuit["qc"].name     # needed to identify the original circuit
             results.shots = actual_shots
+            results.data = copy.copy(results.data)
             results.data.counts = total_counts
             result.results = [ results ]
             
         try:
-            result_handler(active_circuit["qc"],
+            with tracing.span("result_handler", active_circuit["group"], active_circuit["circuit"]):
+                handler(active_circuit["qc"],
                             result,
                             active_circuit["group"],
                             active_circuit["circuit"],
@@ -577,7 +1360,73 @@ def job_complete(job):
         except Exception as e:
             print(f'ERROR: failed to execute result_handler for circuit {active_circuit["group"]} {active_circuit["circuit"]}')
             print(f"... exception = {e}")
+            
+    # release the circuit, as its result has been handled
+    active_circuit["qc"] = None
+    
+    return exec_time
+
 
+# Return the execution time of a circuit from its result
+# The result level time is for the entire job, so use the circuit's experiment times in a group job
+def get_exec_time(result, group_job=False):
+
+    if group_job:
+        return sum([getattr(experiment, "time_taken", 0) for experiment in result.results])
+        
+    if getattr(result, "time_taken", None) != None:
+        return result.time_taken
+        
+    if len(result.results) > 0:
+        return getattr(result.results[0], "time_taken", 0)
+        
+    return 0.0
+
+# Process the result of one part of a circuit whose shots are split into multiple jobs
+# When all of its parts are complete, their results are merged into one result, with the counts
+# merged by the result handling in circuit_complete, and the circuit is completed with it
+# The circuit's exec_time is the longest of the parts, and its exec_time_sum the total of them
+# Returns the execution time of the part
+def split_part_complete(part, result, elapsed_time, exec_step_times):
+
+    split = part["split"]
+    exec_time = get_exec_time(result) if result != None else 0.0
+    
+    split["results"].append(result)
+    split["exec_times"].append(exec_time)
+    
+    # the circuit's elapsed time is from the first launch of its parts until the last completes
+    if split["launch_time"] == None or part["launch_time"] < split["launch_time"]:
+        split["launch_time"] = part["launch_time"]
+    split["end_time"] = max(split["end_time"], part["launch_time"] + elapsed_time)
+    
+    if len(split["results"]) < split["num_parts"]:
+        return exec_time
+        
+    circuit = split["circuit"]
+    
+    # if any of the parts failed, the circuit has no result
+    merged_result = None
+    if not any([r is None for r in split["results"]]):
+        merged_result = copy.copy(split["results"][0])
+        merged_result.results = [experiment for r in split["results"] for experiment in r.results]
+        merged_result.time_taken = max(split["exec_times"])
+        
+    metrics.store_metric(circuit["group"], circuit["circuit"], 'exec_time_sum', sum(split["exec_times"]))
+    
+    circuit_complete(circuit, merged_result, split["end_time"] - split["launch_time"], exec_step_times)
+    
+    return exec_time
+
+# Return the sum of the counts of the given experiment results, accumulated in one pass
+# The counts are merged as stored in the results (e.g. hex keys), and formatted when the handler gets them
+def merge_counts(experiment_results):
+    total_counts = {}
+    for experiment in experiment_results:
+        for key, count in experiment.data.counts.items():
+            total_counts[key] = total_counts.get(key, 0) + count
+            
+    return total_counts
 
 # Process a job, whose status cannot be obtained
 def job_status_failed(job):
@@ -586,17 +1435,41 @@ def job_status_failed(job):
     if verbose:
         print(f'\n... job status failed - group={active_circuit["group"]} id={active_circuit["circuit"]} shots={active_circuit["shots"]}')
     
-    # compute elapsed time for circuit; assume exec is same, unless obtained from result
+    # compute elapsed time for circuit; exec time is reported as 0, with no result
     elapsed_time = time.time() - active_circuit["launch_time"]
-    
-    # report exec time as 0 unless valid measure returned
-    exec_time = 0.0
            
     # remove from list of active circuits
+    num_active = len(active_circuits)
     del active_circuits[job]
+    release_job_slot()
 
-    metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'elapsed_time', elapsed_time)
-    metrics.store_metric(active_circuit["group"], active_circuit["circuit"], 'exec_time', exec_time)
+    # store the metrics for each of the circuits in a group job, with no result
+    circuits = active_circuit["circuits"] if "circuits" in active_circuit else [active_circuit]
+    for circuit in circuits:
+        circuit_complete(circuit, None, elapsed_time, {})
+        
+    update_jobs_active(circuits, num_active, failed=True)
+    journal_job_complete(job, circuits)
+    
+    tracing.record_span("run", active_circuit["launch_time"], active_circuit["launch_time"] + elapsed_time,
+            active_circuit["group"], active_circuit["circuit"], lane=job_lane(active_circuit),
+            job_id=job.job_id(), failed=True)
+
+# Adapt the maximum number of active jobs after a job has completed or failed, if enabled,
+# recording the limit and the reason for any change as metrics of the job's circuits
+def update_jobs_active(circuits, num_active, elapsed_time=0, exec_time=0, failed=False):
+    global max_jobs_active
+    
+    if not adaptive_jobs_active:
+        return
+        
+    max_jobs_active, reason = concurrency.next_jobs_active(max_jobs_active, backend, num_active,
+            elapsed_time=elapsed_time, exec_time=exec_time, failed=failed)
+    
+    for circuit in circuits:
+        metrics.store_metric(circuit["group"], circuit["circuit"], 'max_jobs_active', max_jobs_active)
+        if reason != None:
+            metrics.store_metric(circuit["group"], circuit["circuit"], 'max_jobs_active_reason', reason)
 
         
 ######################################################################
@@ -619,28 +1492,34 @@ def throttle_execution(completion_handler=metrics.finalize_group):
     #if verbose:
         #print(f"... throttling execution, active={len(active_circuits)}, batched={len(batched_circuits)}")
 
-    # check and sleep if not complete
+    # submit the circuits held for a group job, as the group is complete
+    flush_group_circuits()
+    
+    # check and wait if not complete
     done = False
     pollcount = 0
+    waited = False
     while not done:
     
-        # check if any jobs complete
-        check_jobs(completion_handler)
+        # clear the completion event before checking, so no completion is missed while we check
+        job_completion_event.clear()
+        
+        # check if any jobs complete, restarting the increase of the polling delay when any do
+        if check_jobs(completion_handler) > 0:
+            pollcount = 0
 
         # return only when all jobs complete
         if len(batched_circuits) < 1:
             break
             
-        # delay a bit, increasing the delay periodically 
-        sleeptime = 0.25
-        if pollcount > 6: sleeptime = 0.5
-        if pollcount > 60: sleeptime = 1.0
-        time.sleep(sleeptime)
+        # wait for a job to complete, or a delay that increases periodically
+        wait_for_job_completion(pollcount)
         
         pollcount += 1
+        waited = True
     
     if verbose:
-        if pollcount > 0: print("") 
+        if waited: print("") 
         #print(f"... throttling execution(2), active={len(active_circuits)}, batched={len(batched_circuits)}")
 
 # Wait for all active and batched circuits to complete.
@@ -654,54 +1533,84 @@ def finalize_execution(completion_handler=metrics.finalize_group):
     #if verbose:
         #print("... finalize_execution")
 
-    # check and sleep if not complete
+    # submit the circuits held for a group job, as the group is complete
+    flush_group_circuits()
+    
+    # check and wait if not complete
     done = False
     pollcount = 0
+    waited = False
     while not done:
     
-        # check if any jobs complete
-        check_jobs(completion_handler)
+        # clear the completion event before checking, so no completion is missed while we check
+        job_completion_event.clear()
+        
+        # check if any jobs complete, restarting the increase of the polling delay when any do
+        if check_jobs(completion_handler) > 0:
+            pollcount = 0
 
         # return only when all jobs complete
-        if len(active_circuits) < 1:
+        if len(active_circuits) < 1 and len(batched_circuits) < 1:
             break
             
-        # delay a bit, increasing the delay periodically 
-        sleeptime = 0.25
-        if pollcount > 6: sleeptime = 0.5
-        if pollcount > 60: sleeptime = 1.0
-        time.sleep(sleeptime)
+        # wait for a job to complete, or a delay that increases periodically
+        wait_for_job_completion(pollcount)
         
         pollcount += 1
+        waited = True
     
     if verbose:
-        if pollcount > 0: print("")
+        if waited: print("")
+    
+    # all the jobs of the run are complete, so its journal is no longer needed
+    journal_run_complete()
+    
+    # all the circuits have been launched, so the transpile stage has no more work
+    shutdown_transpile_pool()
     
     # indicate we are done collecting metrics (called once at end of app)
     metrics.end_metrics()
     
     
-# Check if any active jobs are complete - process if so
-# Before returning, launch any batched jobs that will keep active circuits < max
+# Check if any active jobs are complete - process all that are
+# Launch any batched jobs that will keep active circuits < max, into the slots freed by
+# completed jobs first, so the backend is kept busy while their results are being processed.
 # When any job completes, aggregate and report group metrics if all circuits in group are done
 # then return, don't sleep
+# Returns the number of jobs completed
 
 def check_jobs(completion_handler=None):
     
-    for job, circuit in active_circuits.items():
+    # query the status of the active jobs, in one request if supported (see job_status module);
+    # the exception is returned if the status can't be obtained after retries
+    job_statuses = job_status.get_job_statuses(backend, list(active_circuits.keys()))
+    
+    return process_job_statuses(job_statuses, completion_handler)
 
-        try:
-            status = job.status()
-            #print("Job status is ", status)
+# Process the statuses obtained for the active jobs, completing those that are done
+# Returns the number of jobs completed
+def process_job_statuses(job_statuses, completion_handler=None):
+
+    # collect all the jobs that are complete in this sweep
+    completed_jobs = []
+    
+    for job, status in job_statuses:
+        #print("Job status is ", status)
+        
+        # the job may have been completed already, if statuses were obtained concurrently
+        if job not in active_circuits:
+            continue
             
-        except Exception as e:
+        circuit = active_circuits[job]
+        
+        if isinstance(status, Exception):
             print(f'ERROR: Unable to retrieve job status for circuit {circuit["group"]} {circuit["circuit"]}')
-            print(f"... job = {job.job_id()}  exception = {e}")
+            print(f"... job = {job.job_id()}  exception = {status}")
             
             # finish the job by removing from active list
             job_status_failed(job)
             
-            break
+            continue
 
         circuit["pollcount"] += 1
         
@@ -734,31 +1643,444 @@ def check_jobs(completion_handler=None):
                 print(f"    job = {job.job_id()}  {job.error_message()}")
 
         if status == JobStatus.DONE or status == JobStatus.CANCELLED or status == JobStatus.ERROR:
-            #if verbose: print("Job status is ", job.status() )
+            completed_jobs.append((job, status))
             
-            active_circuit = active_circuits[job]
-            group = active_circuit["group"]
+    # refill the slots of the completed jobs before processing their results
+    launch_batched_circuits(free_slots=len(completed_jobs))
+    
+    for job, status in completed_jobs:
+        #if verbose: print("Job status is ", status )
+        
+        group = active_circuits[job]["group"]
+        
+        # process the job and its result data
+        job_complete(job, status)
+        
+        # call completion handler with the group id
+        if completion_handler != None:
+            completion_handler(group)
+
+    # if not at maximum jobs and there are jobs in batch, then execute more
+    launch_batched_circuits()
+    
+    return len(completed_jobs)
+    
+# Launch batched circuits until the maximum number of active jobs is reached,
+# counting the given number of active jobs as already completed
+def launch_batched_circuits(free_slots=0):
+
+    while len(batched_circuits) > 0 and len(active_circuits) - free_slots < max_jobs_active:
+
+        # wait for a slot to be released by another app, if sharing the active job limit
+        if not acquire_job_slot():
+            break
             
-            # process the job and its result data
-            job_complete(job)
+        # pop the first circuit in the batch that is ready and launch execution
+        circuit = pop_ready_circuit()
+        if circuit == None:
+            release_job_slot()
+            break
+            
+        if verbose:
+            print(f'... pop and submit circuit - group={circuit["group"]} id={circuit["circuit"]} shots={circuit["shots"]}')
             
-            # call completion handler with the group id
-            if completion_handler != None:
+        execute_circuit(circuit)  
+        
+# Remove and return the first batched circuit that is ready to execute, i.e. its transpile is done
+# Return None if no batched circuit is ready
+def pop_ready_circuit():
+
+    for i, circuit in enumerate(batched_circuits):
+        if is_transpile_done(circuit):
+            del batched_circuits[i]
+            return circuit
+            
+    return None
+    
+# Acquire a slot of the active job limit shared with other apps, without waiting
+# Return True if acquired, or if the limit is not shared
+def acquire_job_slot():
+    if shared_job_slots == None:
+        return True
+    return shared_job_slots.acquire(block=False)
+    
+# Release a slot of the active job limit shared with other apps, when a job is no longer active
+def release_job_slot():
+    if shared_job_slots != None:
+        shared_job_slots.release()
+    
+# Register a callback that sets the job completion event when the job is done,
+# if the job wraps a future (as Aer jobs do).
+# Return True if registered; otherwise the job can only be polled for its status
+def register_completion_callback(job):
+
+    future = getattr(job, "_future", None)
+    if future is None or not callable(getattr(future, "add_done_callback", None)):
+        return False
+        
+    future.add_done_callback(lambda f: job_completion_event.set())
+    return True
+    
+# Wait for any active job to complete, or until the polling delay expires.
+# Jobs with a future wake the waiting loop immediately when done, so if all active jobs have one,
+# the delay is only a safeguard; otherwise it is the polling interval for the remote jobs,
+# increased periodically the longer we have been waiting since a job last completed
+# (pollcount is the number of polls since then)
+# Slots released by other apps sharing the active job limit do not wake the loop, so batched
+# circuits waiting for one are launched at the next poll
+def wait_for_job_completion(pollcount):
+
+    if shared_job_slots != None and len(batched_circuits) > 0:
+        sleeptime = 0.1
+    elif len(active_circuits) > 0 and all(c["has_future"] for c in active_circuits.values()):
+        sleeptime = 1.0
+    else:
+        sleeptime = 0.25
+        if pollcount > 6: sleeptime = 0.5
+        if pollcount > 60: sleeptime = 1.0
+        
+    # poll sooner if the statuses of some jobs were left for the next poll by the rate limit of status requests
+    sleeptime = job_status.next_poll_delay(sleeptime)
+    
+    job_completion_event.wait(sleeptime)
+    
+
+######################################################################
+# ASYNCIO EXECUTION METHODS
+
+# These methods provide the job management above for use from an asyncio event loop,
+# without blocking it. The blocking operations (transpiling and launching jobs, processing
+# results, and provider status checks) are run in executor threads. Operations that change the
+# active and batched circuits are run one at a time, as they share the module state.
+#
+# Example usage:
+#   await ex.submit_async(qc, num_qubits, s_int, shots=num_shots)
+#   await ex.throttle_async(metrics.finalize_group)
+#   await ex.drain(metrics.finalize_group)
+
+# Lock that serializes the operations on the module state, created for the running event loop
+async_lock = None
+async_lock_loop = None
+
+# Return the lock for the running event loop
+def get_async_lock():
+    global async_lock, async_lock_loop
+    
+    loop = asyncio.get_running_loop()
+    if async_lock == None or async_lock_loop is not loop:
+        async_lock = asyncio.Lock()
+        async_lock_loop = loop
+        
+    return async_lock
+    
+# Run a function that changes the module state in an executor thread, one at a time
+async def run_locked(func, *args):
+    async with get_async_lock():
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+# Submit circuit for execution, as in submit_circuit()
+async def submit_async(qc, group_id, circuit_id, shots=100, handler=None, num_splits=None, parameter_values=None):
+    await run_locked(functools.partial(submit_circuit, qc, group_id, circuit_id, shots=shots, handler=handler,
+            num_splits=num_splits, parameter_values=parameter_values))
+    
+# Check if any active jobs are complete and process them, as in check_jobs()
+# The status of each active job is obtained concurrently, in executor threads
+# Returns the number of jobs completed
+async def check_jobs_async(completion_handler=None):
+    loop = asyncio.get_running_loop()
+    
+    async with get_async_lock():
+        jobs = list(active_circuits.keys())
+        
+    job_statuses = await loop.run_in_executor(None,
+            functools.partial(job_status.get_job_statuses, backend, jobs, concurrent=True))
+    
+    return await run_locked(process_job_statuses, job_statuses, completion_handler)
+    
+# Wait until all batched circuits have been launched, as in throttle_execution()
+async def throttle_async(completion_handler=metrics.finalize_group):
+    await run_locked(flush_group_circuits)
+    await wait_async(completion_handler, lambda: len(batched_circuits) < 1)
+
+# Wait until all active and batched circuits are complete, as in finalize_execution()
+# Unlike finalize_execution(), this does not end the metrics collection for the app
+async def drain(completion_handler=metrics.finalize_group):
+    await run_locked(flush_group_circuits)
+    await wait_async(completion_handler, lambda: len(active_circuits) < 1 and len(batched_circuits) < 1)
+    
+    # all the jobs of the run are complete, so its journal is no longer needed
+    journal_run_complete()
+
+# Check jobs until the given condition is met, waiting for a job to complete between checks
+async def wait_async(completion_handler, is_done):
+    loop = asyncio.get_running_loop()
+    
+    pollcount = 0
+    while True:
+    
+        # clear the completion event before checking, so no completion is missed while we check
+        job_completion_event.clear()
+        
+        # restart the increase of the polling delay when any jobs complete
+        if await check_jobs_async(completion_handler) > 0:
+            pollcount = 0
+        
+        if is_done():
+            break
+            
+        # wait for a job to complete, or a delay that increases periodically
+        await loop.run_in_executor(None, wait_for_job_completion, pollcount)
+        
+        pollcount += 1
+        
+    
+######################################################################
+# JOB JOURNAL METHODS
+
+# Jobs launched on remote backends are recorded in a journal on disk (see job_journal module).
+# If the program is interrupted while jobs are queued, the run can be resumed after restarting:
+#   metrics.init_metrics()
+#   ex.init_execution(execution_handler)
+#   ex.set_execution_target(backend_id, ...)
+#   ex.resume_execution()
+#   metrics.plot_metrics_aq(...)
+
+# Return True if jobs launched on the current backend are recorded in the journal
+# Jobs on local simulators cannot be retrieved after the program is interrupted, so are not recorded
+def is_journaled():
+    return use_job_journal and not concurrency.is_local(backend)
+    
+# Return the name of the current backend
+def get_backend_name():
+    return backend.name() if callable(getattr(backend, "name", None)) else str(backend.name)
+
+# Record the completion of a job in the journal, with the metrics of its circuits
+def journal_job_complete(job, circuits):
+
+    if not is_journaled():
+        return
+        
+    circuit_metrics = {}
+    for circuit in circuits:
+        group = str(circuit["group"])
+        circuit_id = str(circuit["circuit"])
+        if group not in circuit_metrics:
+            circuit_metrics[group] = {}
+        circuit_metrics[group][circuit_id] = metrics.circuit_metrics.get(group, {}).get(circuit_id, {})
+        
+    job_journal.record_complete(job.job_id(), get_backend_name(), journal_run_id, circuit_metrics)
+    
+# Remove the journal of the current run, as all of its jobs are complete
+def journal_run_complete():
+
+    if not is_journaled():
+        return
+        
+    job_journal.remove_run(journal_run_id)
+    
+# Resume the latest interrupted run on the current backend, from the job journal
+# The jobs that had not completed are retrieved from the provider instead of being submitted again,
+# and their results processed with the given result handler (or the one passed to init_execution).
+# The metrics stored for all circuits of the run before it was interrupted are restored.
+# The app may be given (the module of the run's result handler) to resume its latest run instead.
+# Waits for all the jobs to complete, as in finalize_execution(); returns the number of jobs resumed
+def resume_execution(handler=None, app=None, completion_handler=metrics.finalize_group):
+    global result_handler, journal_run_id
+    
+    if handler != None:
+        result_handler = handler
+        
+    launches, completes = job_journal.load_run(get_backend_name(), app=app, exclude_run_id=journal_run_id)
+    if len(launches) == 0:
+        print("... no jobs to resume in the job journal")
+        return 0
+        
+    print(f'... resuming run {launches[0]["run_id"]} of app {launches[0]["app"]}')
+    
+    # continue the interrupted run, so the completion of its jobs is recorded in its journal
+    journal_run_id = launches[0]["run_id"]
+    
+    groups = []
+    pending_groups = set()
+    num_resumed = 0
+    
+    for record in launches:
+        completed = completes.get(record["job_id"])
+        
+        # restore the metrics of the circuits, as stored on completion of the job or at its launch
+        for c in record["circuits"]:
+            circuit_metrics = c["metrics"]
+            if completed != None:
+                circuit_metrics = completed["metrics"].get(str(c["group"]), {}).get(str(c["circuit"]), circuit_metrics)
+                
+            for metric, value in circuit_metrics.items():
+                metrics.store_metric(c["group"], c["circuit"], metric, value)
+                
+            if c["group"] not in groups:
+                groups.append(c["group"])
+                
+        if completed != None:
+            continue
+            
+        active_circuit = resumed_circuit(record)
+        circuits = active_circuit["circuits"] if "circuits" in active_circuit else [active_circuit]
+        
+        # reattach to the job, to process its result when it is done
+        try:
+            job = retrieve_job(record["job_id"])
+            
+        except Exception as e:
+            print(f'ERROR: Failed to retrieve job {record["job_id"]} for circuit {active_circuit["group"]} {active_circuit["circuit"]}')
+            print(f"... exception = {e}")
+            
+            # report exec time as 0, as for a job whose status cannot be obtained
+            for circuit in circuits:
+                metrics.store_metric(circuit["group"], circuit["circuit"], 'elapsed_time', 0.0)
+                metrics.store_metric(circuit["group"], circuit["circuit"], 'exec_time', 0.0)
+            continue
+            
+        active_circuit["has_future"] = register_completion_callback(job)
+        active_circuits[job] = active_circuit
+        num_resumed += 1
+        
+        for circuit in circuits:
+            pending_groups.add(circuit["group"])
+        
+    print(f"... resumed {num_resumed} jobs")
+    
+    # report the groups whose circuits all completed before the run was interrupted
+    if completion_handler != None:
+        for group in groups:
+            if group not in pending_groups:
                 completion_handler(group)
+            
+    # its journal is removed once all its jobs are complete
+    finalize_execution(completion_handler)
+    
+    return num_resumed
+    
+# Return the active circuit dict for a job recorded in the journal
+def resumed_circuit(record):
+
+    circuits = []
+    for c in record["circuits"]:
+        qc = job_journal.decode_circuit(c["qpy"])
+        if circuit_cache.circuit_fingerprint(qc) != c["fingerprint"]:
+            print(f'WARNING: circuit {c["group"]} {c["circuit"]} in job journal does not match its fingerprint')
+            
+        circuits.append({ "qc": qc, "group": c["group"], "circuit": c["circuit"], "shots": c["shots"],
+                "submit_time": c["submit_time"], "launch_time": record["launch_time"], "pollcount": 0,
+                "num_experiments": c["num_experiments"] })
                 
-            break
+    if not record["group_job"]:
+        return circuits[0]
+        
+    return { "group": circuits[0]["group"], "circuit": ",".join([str(c["circuit"]) for c in circuits]),
+            "shots": circuits[0]["shots"], "submit_time": circuits[0]["submit_time"],
+            "launch_time": record["launch_time"], "pollcount": 0, "circuits": circuits }
+            
+# Retrieve a job from the provider of the current backend
+def retrieve_job(job_id):
 
-    # if not at maximum jobs and there are jobs in batch, then execute another
-    if len(active_circuits) < max_jobs_active and len(batched_circuits) > 0:
+    if callable(getattr(backend, "retrieve_job", None)):
+        return backend.retrieve_job(job_id)
+        
+    provider = backend.provider() if callable(getattr(backend, "provider", None)) else None
+    
+    # IBMQ providers retrieve jobs through their backend service
+    service = getattr(provider, "backend", None)
+    if callable(getattr(service, "retrieve_job", None)):
+        return service.retrieve_job(job_id)
+        
+    if callable(getattr(provider, "retrieve_job", None)):
+        return provider.retrieve_job(job_id)
+        
+    raise ValueError(f"provider of backend {get_backend_name()} cannot retrieve jobs")
+    
 
-        # pop the first circuit in the batch and launch execution
-        circuit = batched_circuits.pop(0)
-        if verbose:
-            print(f'... pop and submit circuit - group={circuit["group"]} id={circuit["circuit"]} shots={circuit["shots"]}')
+######################################################################
+# TRANSPILE STAGE METHODS
+
+# The transpile stage transpiles circuits in a pool of worker processes as they are submitted.
+# Both the metrics transpile and the execution transpile are done there; the transpiled circuits
+# are stored with the circuit and used when it is launched, instead of transpiling it then.
+
+# Start transpiling a circuit in the transpile stage
+def start_staged_transpile(circuit):
+    global transpile_pool, transpile_pool_workers
+    
+    transpile_args = [metrics_transpile_args(), exec_transpile_args()]
+    if transpile_args == [None, None]:
+        return
+        
+    if transpile_pool == None or transpile_pool_workers != max_transpile_workers:
+        if transpile_pool != None:
+            transpile_pool.shutdown(wait=False)
             
-        execute_circuit(circuit)  
+        # use spawn to start the workers, as forking a process with running threads (e.g. Aer) is unsafe
+        transpile_pool = ProcessPoolExecutor(max_workers=max_transpile_workers,
+                mp_context=multiprocessing.get_context("spawn"))
+        transpile_pool_workers = max_transpile_workers
+    
+    future = transpile_pool.submit(transpile_worker, circuit["qc"], transpile_args, use_transpile_cache)
+    
+    # wake the waiting loops when done, so the circuit can be launched
+    future.add_done_callback(lambda f: job_completion_event.set())
+    
+    circuit["transpile_future"] = future
+    
+# Shut down the process pool of the transpile stage, if created, stopping its worker processes
+# Transpiles not yet started are canceled, as no circuits are waiting for them at the end of a run
+def shutdown_transpile_pool():
+    global transpile_pool
+    
+    if transpile_pool != None:
+        transpile_pool.shutdown(wait=True, cancel_futures=True)
+        transpile_pool = None
         
+# Transpile a circuit for each of the given (backend, options) pairs, None where no transpile is needed
+# This is executed in the worker processes of the transpile stage
+def transpile_worker(qc, transpile_args, use_cache):
+
+    trans_qcs = []
+    for args in transpile_args:
+        if args == None:
+            trans_qcs.append(None)
+        elif use_cache:
+            trans_qcs.append(circuit_cache.transpile(qc, args[0], **args[1]))
+        else:
+            trans_qcs.append(transpile(qc, args[0], **args[1]))
+            
+    return trans_qcs
+    
+# Return True if the circuit (or all circuits of a group job) is not waiting in the transpile stage
+def is_transpile_done(circuit):
+
+    circuits = circuit["circuits"] if "circuits" in circuit else [circuit]
+    for c in circuits:
+        if "transpile_future" in c and not c["transpile_future"].done():
+            return False
+    
+    return True
+    
+# Return the circuits transpiled for metrics and for execution in the transpile stage,
+# None for each that was not done there (or failed, in which case it is done when launched)
+def get_staged_transpile(circuit):
 
+    if "transpile_future" not in circuit:
+        return None, None
+        
+    future = circuit.pop("transpile_future")
+    try:
+        metrics_trans_qc, exec_trans_qc = future.result()
+        return metrics_trans_qc, exec_trans_qc
+        
+    except Exception as e:
+        print(f'WARNING: transpile stage failed for circuit {circuit["group"]} {circuit["circuit"]}, transpiling on launch')
+        print(f"... exception = {e}")
+        return None, None
+    
+    
 # Test circuit execution
 def test_execution():
     pass
@@ -777,6 +2099,9 @@ def test_execution():
 
 def execute_circuits():
 
+    # submit the circuits held for a group job
+    flush_group_circuits()
+
     # deprecated code ...
     '''
     for batched_circuit in batched_circuits:
@@ -796,28 +2121,31 @@ def wait_for_completion():
     if verbose:
         print("... waiting for completion")
 
-    # check and sleep if not complete
+    # check and wait if not complete
     done = False
     pollcount = 0
+    waited = False
     while not done:
     
-        # check if any jobs complete
-        check_jobs()
+        # clear the completion event before checking, so no completion is missed while we check
+        job_completion_event.clear()
+        
+        # check if any jobs complete, restarting the increase of the polling delay when any do
+        if check_jobs() > 0:
+            pollcount = 0
 
         # return only when all jobs complete
         if len(active_circuits) < 1:
             break
             
-        # delay a bit, increasing the delay periodically 
-        sleeptime = 0.25
-        if pollcount > 6: sleeptime = 0.5
-        if pollcount > 60: sleeptime = 1.0
-        time.sleep(sleeptime)
+        # wait for a job to complete, or a delay that increases periodically
+        wait_for_job_completion(pollcount)
         
         pollcount += 1
+        waited = True
     
     if verbose:
-        if pollcount > 0: print("")
+        if waited: print("")
 
 
 # Wait for a single job to complete, return when done
@@ -0,0 +1,160 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Job Journal Module - Qiskit
+#
+# This module keeps an on-disk journal of the jobs submitted for execution, so that if the program
+# is interrupted while jobs are queued on a remote backend, the jobs can be retrieved from the provider
+# and their results processed, instead of being submitted again (see execute.resume_execution).
+#
+# The journal of each run is a file of JSON lines, appended to as jobs are launched and completed.
+# The file is removed when all the jobs of the run have completed, or when an interrupted run has been
+# resumed, so only the journals of interrupted runs are kept.
+# A launch record holds the job id, backend, the run and app it belongs to, and for each circuit in the
+# job its group and circuit id, shots, timestamps, fingerprint, the circuit itself (as QPY), and the
+# metrics stored for it so far. A completion record holds the metrics of each circuit once processed.
+#
+
+import os
+import io
+import json
+import base64
+
+from qiskit import qpy
+
+import circuit_cache
+
+# Directory in which the journal files are stored
+journal_dir = "__cache"
+
+# Prefix and extension of the name of the journal file of each run, which is named with the run id
+journal_prefix = "journal-"
+journal_extension = ".jsonl"
+
+# Return the path of the journal file of the given run
+def journal_path(run_id):
+    return os.path.join(journal_dir, f"{journal_prefix}{run_id}{journal_extension}")
+
+# Return the ids of the runs with a journal file, in the order they were started
+def journal_run_ids():
+    if not os.path.isdir(journal_dir):
+        return []
+
+    run_ids = [name[len(journal_prefix):-len(journal_extension)] for name in os.listdir(journal_dir)
+            if name.startswith(journal_prefix) and name.endswith(journal_extension)]
+    return sorted(run_ids, key=lambda run_id: os.path.getmtime(journal_path(run_id)))
+
+# Append a launch record for a job, with the given circuit dicts (one, or all circuits of a group job)
+# The metrics of each circuit are given in a dict keyed by group and circuit id
+def record_launch(job_id, backend_name, run_id, app, launch_time, circuits, group_job, circuit_metrics):
+
+    record = { "event": "launch", "job_id": job_id, "backend": backend_name,
+            "run_id": run_id, "app": app, "launch_time": launch_time,
+            "group_job": group_job, "circuits": [] }
+
+    for circuit in circuits:
+        record["circuits"].append({
+            "group": circuit["group"],
+            "circuit": circuit["circuit"],
+            "shots": circuit["shots"],
+            "submit_time": circuit.get("submit_time"),
+            "num_experiments": circuit.get("num_experiments", 1),
+            "fingerprint": circuit_cache.circuit_fingerprint(circuit["qc"]),
+            "qpy": encode_circuit(circuit["qc"]),
+            "metrics": circuit_metrics.get(str(circuit["group"]), {}).get(str(circuit["circuit"]), {})
+        })
+
+    append_record(run_id, record)
+
+# Append a completion record for a job of the given run, with the metrics of its circuits,
+# keyed by group and circuit id
+def record_complete(job_id, backend_name, run_id, circuit_metrics):
+    append_record(run_id, { "event": "complete", "job_id": job_id, "backend": backend_name,
+            "metrics": circuit_metrics })
+
+# Return the launch records of the latest run on the given backend (of the given app, if not None),
+# excluding the given current run, and the completion records of their jobs, keyed by job id
+def load_run(backend_name, app=None, exclude_run_id=None):
+
+    for run_id in reversed(journal_run_ids()):
+        if run_id == exclude_run_id:
+            continue
+
+        launches, completes = load_records(run_id, backend_name)
+        if len(launches) > 0 and (app == None or launches[0]["app"] == app):
+            return launches, completes
+
+    return [], {}
+
+# Return the launch records in the journal of the given run on the given backend,
+# and the completion records of their jobs, keyed by job id
+def load_records(run_id, backend_name):
+
+    launches = []
+    completes = {}
+
+    with open(journal_path(run_id), "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # the last line may be incomplete, if the program was interrupted while writing it
+                continue
+
+            if record.get("backend") != backend_name:
+                continue
+
+            if record["event"] == "launch":
+                launches.append(record)
+
+            elif record["event"] == "complete":
+                completes[record["job_id"]] = record
+
+    return launches, completes
+
+# Remove the journal file of the given run, e.g. when all of its jobs have completed
+def remove_run(run_id):
+    if os.path.isfile(journal_path(run_id)):
+        os.remove(journal_path(run_id))
+
+# Remove the journal files of all runs
+def clear_journal():
+    for run_id in journal_run_ids():
+        remove_run(run_id)
+
+def append_record(run_id, record):
+    try:
+        os.makedirs(journal_dir, exist_ok=True)
+        with open(journal_path(run_id), "a") as f:
+            f.write(json.dumps(record, default=json_value) + "\n")
+            f.flush()
+
+    except Exception as e:
+        print(f"WARNING: unable to write job journal {journal_path(run_id)}, exception = {e}")
+
+# Convert a value that is not JSON serializable, e.g. numpy numbers, to one that is
+def json_value(value):
+    return value.item() if hasattr(value, "item") else str(value)
+
+# Return a circuit serialized as QPY, encoded as a base64 string
+def encode_circuit(qc):
+    buffer = io.BytesIO()
+    qpy.dump(qc, buffer)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+# Return the circuit serialized by encode_circuit
+def decode_circuit(data):
+    return qpy.load(io.BytesIO(base64.b64decode(data)))[0]
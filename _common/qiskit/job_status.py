@@ -0,0 +1,284 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Job Status Module - Qiskit
+#
+# This module obtains the status of the active jobs for each poll of the execute module.
+# For remote backends, each status request is a round trip to the provider, so:
+#   - the statuses of all the jobs are obtained in one bulk request, where the provider supports it:
+#     backends with a job_statuses(job_ids) method (e.g. the mock backend), and IBMQ backends, for which
+#     the request obtains the status of the jobs that are complete, the others being unknown until then
+#   - the requests are limited to a rate, with a burst allowance, declared by the backend where it has a
+#     limit of its own (as the mock backend does), else set by the options below; jobs whose status cannot
+#     be requested within the rate are left for the next poll, made as soon as the rate allows
+#   - a job whose status cannot be obtained is retried after a backoff, doubled for each retry,
+#     and is only reported as failed after max_status_retries retries
+# Statuses of jobs on local simulators are obtained directly from each job, without a rate limit.
+#
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from qiskit.providers.jobstatus import JOB_FINAL_STATES
+
+import concurrency
+
+# Option to obtain the statuses of all jobs in one request, where the provider supports it
+use_bulk_status = True
+
+# Maximum rate of status requests to the provider of a remote backend, per sec, and the burst allowed,
+# used if the backend does not declare its own (as status_requests_per_sec and status_request_burst)
+# None = no limit
+max_requests_per_sec = 5.0
+max_request_burst = 10
+
+# Statuses of the jobs that are complete, as queried on IBMQ backends
+final_statuses = list(JOB_FINAL_STATES)
+
+# Number of retries after a job's status cannot be obtained, before it is reported as failed
+max_status_retries = 3
+
+# Secs before the first retry, doubled for each retry up to the maximum
+retry_backoff = 1.0
+max_retry_backoff = 30.0
+
+# Number of consecutive status errors of each job, and the time before which it is not retried,
+# keyed by job id
+status_errors = {}
+retry_times = {}
+
+# Position in the active jobs of the first job whose status is requested in the next poll
+next_request_index = 0
+
+# Whether the statuses of some jobs were left for the next poll, as above the rate, in the last poll
+requests_deferred = False
+
+# Threads in which the statuses of jobs are requested concurrently, if requested one at a time
+status_pool = None
+
+# A limit on the rate of requests, allowing a burst of requests up to its capacity
+class RateLimiter:
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.update_time = time.time()
+        self.lock = threading.Lock()
+
+    # Take one request from the allowance if available, returning False if the rate is exceeded
+    def acquire(self):
+        if self.rate == None:
+            return True
+
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.capacity, self.tokens + (now - self.update_time) * self.rate)
+            self.update_time = now
+
+            if self.tokens < 1:
+                return False
+
+            self.tokens -= 1
+            return True
+
+    # Return the secs until a request is available, 0 if one is available now
+    def wait_time(self):
+        if self.rate == None:
+            return 0.0
+
+        with self.lock:
+            tokens = min(self.capacity, self.tokens + (time.time() - self.update_time) * self.rate)
+            return max((1 - tokens) / self.rate, 0.0)
+
+rate_limiter = None
+
+# Return the maximum rate of status requests to the provider of the backend, per sec, and the burst allowed:
+# those declared by the backend, as it knows its provider's limit, or else the options
+def get_request_rate(backend):
+    if hasattr(backend, "status_requests_per_sec"):
+        return backend.status_requests_per_sec, getattr(backend, "status_request_burst", max_request_burst)
+    return max_requests_per_sec, max_request_burst
+
+# Return the rate limiter of the status requests to the backend, created with its current rate
+def get_rate_limiter(backend):
+    global rate_limiter
+    rate, burst = get_request_rate(backend)
+    if rate_limiter == None or rate_limiter.rate != rate or rate_limiter.capacity != burst:
+        rate_limiter = RateLimiter(rate, burst)
+    return rate_limiter
+
+# Return the secs to wait before the next poll, given the delay the caller would otherwise wait:
+# shorter if the statuses of some jobs were left for the next poll, to request them as soon as the rate allows
+def next_poll_delay(delay):
+    if not requests_deferred or rate_limiter == None:
+        return delay
+    return min(delay, rate_limiter.wait_time())
+
+# Clear the retry state of the jobs, at the start of an app
+def init_job_status():
+    status_errors.clear()
+    retry_times.clear()
+
+# Return the status of the given jobs, as a list of (job, status) pairs, where the status is the
+# exception raised if it could not be obtained after all retries
+# Jobs whose status was not obtained in this poll (waiting to retry, above the rate, or unknown as not
+# complete on an IBMQ backend, see ibmq_job_statuses) are not included
+# If concurrent, the statuses of jobs requested one at a time are requested in a pool of threads
+def get_job_statuses(backend, jobs, concurrent=False):
+
+    # forget the jobs that are no longer active
+    job_ids = set([job.job_id() for job in jobs])
+    for job_id in list(status_errors):
+        if job_id not in job_ids:
+            status_errors.pop(job_id, None)
+            retry_times.pop(job_id, None)
+
+    global requests_deferred
+    requests_deferred = False
+
+    now = time.time()
+    jobs = [job for job in jobs if retry_times.get(job.job_id(), 0) <= now]
+    if len(jobs) == 0:
+        return []
+
+    # statuses of jobs on local simulators are obtained without a request to a provider
+    if concurrency.is_local(backend):
+        statuses = dict(zip([job.job_id() for job in jobs], request_statuses(jobs, concurrent)))
+    else:
+        statuses = request_remote_statuses(backend, jobs, concurrent)
+
+    job_statuses = []
+    for job in jobs:
+        if job.job_id() not in statuses:
+            continue
+
+        status = statuses[job.job_id()]
+
+        # retry a job whose status could not be obtained, until the retries are exhausted
+        if isinstance(status, Exception):
+            if not status_retries_exhausted(job, status):
+                continue
+
+        else:
+            status_errors.pop(job.job_id(), None)
+            retry_times.pop(job.job_id(), None)
+
+            # the status is None if it is unknown, though requested, so the job is left as it was
+            if status == None:
+                continue
+
+        job_statuses.append((job, status))
+
+    return job_statuses
+
+# Return the statuses of jobs on a remote backend, obtained within the rate limit, keyed by job id
+def request_remote_statuses(backend, jobs, concurrent=False):
+    global next_request_index, requests_deferred
+
+    limiter = get_rate_limiter(backend)
+    statuses = {}
+
+    # request the statuses of all the jobs at once, if supported
+    bulk_method = get_bulk_status_method(backend) if use_bulk_status else None
+    if bulk_method != None:
+        if not limiter.acquire():
+            requests_deferred = True
+            return statuses
+
+        try:
+            statuses = bulk_method(jobs)
+        except Exception as e:
+            statuses = { job.job_id(): e for job in jobs }
+
+    # request the statuses of the other jobs one at a time, within the rate,
+    # starting from a different job in each poll, so that every job is requested in turn
+    pending_jobs = [job for job in jobs if job.job_id() not in statuses]
+    start = next_request_index % len(pending_jobs) if len(pending_jobs) > 0 else 0
+
+    requested_jobs = []
+    for job in pending_jobs[start:] + pending_jobs[:start]:
+        if not limiter.acquire():
+            requests_deferred = True
+            break
+        requested_jobs.append(job)
+    next_request_index = start + len(requested_jobs)
+
+    for job, status in zip(requested_jobs, request_statuses(requested_jobs, concurrent)):
+        statuses[job.job_id()] = status
+
+    return statuses
+
+# Schedule the retry of a job whose status could not be obtained,
+# returning True if the retries are exhausted instead
+def status_retries_exhausted(job, exception):
+
+    errors = status_errors.get(job.job_id(), 0) + 1
+    if errors > max_status_retries:
+        return True
+
+    status_errors[job.job_id()] = errors
+    backoff = min(retry_backoff * 2 ** (errors - 1), max_retry_backoff)
+    retry_times[job.job_id()] = time.time() + backoff
+
+    print(f"WARNING: unable to retrieve status of job {job.job_id()}, retry {errors} in {round(backoff, 3)} secs")
+    print(f"... exception = {exception}")
+
+    return False
+
+# Return the statuses of the given jobs, requested one at a time
+def request_statuses(jobs, concurrent=False):
+    global status_pool
+
+    if concurrent and len(jobs) > 1:
+        if status_pool == None:
+            status_pool = ThreadPoolExecutor()
+        return list(status_pool.map(get_job_status, jobs))
+
+    return [get_job_status(job) for job in jobs]
+
+# Return the status of a job, or the exception raised if it cannot be obtained
+def get_job_status(job):
+    try:
+        return job.status()
+    except Exception as e:
+        return e
+
+# Return a function obtaining the statuses of jobs on the backend in one request,
+# as a dict of status keyed by job id, or None if not supported by the backend's provider
+def get_bulk_status_method(backend):
+
+    if callable(getattr(backend, "job_statuses", None)):
+        return lambda jobs: backend.job_statuses([job.job_id() for job in jobs])
+
+    if type(backend).__module__.startswith("qiskit.providers.ibmq") and callable(getattr(backend, "jobs", None)):
+        return lambda jobs: ibmq_job_statuses(backend, jobs)
+
+    return None
+
+# Return the statuses of jobs on an IBMQ backend, from one query of those of the jobs that are complete
+# The jobs returned by the query are in a final state, which their status() returns without another request;
+# the exact state of the other jobs (e.g. queued or running) would take a request for each, so their status
+# is None, as unknown, and they remain active with their status unchanged until the query returns them
+def ibmq_job_statuses(backend, jobs):
+    job_ids = [job.job_id() for job in jobs]
+    completed_jobs = backend.jobs(limit=len(job_ids), status=final_statuses,
+            db_filter={ "id": { "inq": job_ids } })
+
+    statuses = { job_id: None for job_id in job_ids }
+    statuses.update({ job.job_id(): job.status() for job in completed_jobs })
+    return statuses
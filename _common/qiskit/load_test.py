@@ -0,0 +1,160 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Load Test - Qiskit
+#
+# This program submits thousands of circuits through the execute module to the mock backend
+# (see mock_backend module), in groups as the benchmarks do, to measure the overhead of the job
+# management (check_jobs, throttle_execution, job_status_failed ...) offline.
+# It reports the wall and CPU time taken, and how long after its job completed each result was processed.
+#
+# Usage (from the top level directory):
+#   python _common/qiskit/load_test.py [--circuits N] [--groups N] [--max-jobs-active N] ...
+#   python _common/qiskit/load_test.py --help
+#
+
+import os
+import sys
+import time
+import argparse
+
+common_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[1:1] = [ common_dir, os.path.join(common_dir, "qiskit") ]
+
+from qiskit import QuantumCircuit, transpile
+
+import execute as ex
+import metrics
+import job_status
+import mock_backend
+
+# Number of results processed by the result handler
+num_results = 0
+
+# Result handler, obtaining the counts as the benchmarks do
+def handle_result(qc, result, num_qubits, circuit_id, num_shots):
+    global num_results
+    counts = result.get_counts(qc)
+    metrics.store_metric(num_qubits, circuit_id, 'fidelity', 1.0 if len(counts) > 0 else 0.0)
+    num_results += 1
+
+# Return a GHZ circuit on the given number of qubits, transpiled for the mock backend
+def create_circuit(num_qubits, backend):
+    qc = QuantumCircuit(num_qubits, num_qubits, name=f"ghz-{num_qubits}")
+    qc.h(0)
+    for i in range(1, num_qubits):
+        qc.cx(i - 1, i)
+    qc.measure(range(num_qubits), range(num_qubits))
+    return transpile(qc, backend)
+
+# Submit the circuits in groups and wait for all to complete, returning the mock backend used
+def run(num_circuits=2000, num_groups=10, num_qubits=5, num_shots=100, max_jobs_active=20,
+        validating_time=0.0, queued_time=0.05, running_time=0.02, max_running_jobs=None,
+        error_rate=0.0, status_error_rate=0.0, status_requests_per_sec=None, batch_group_jobs=False, adaptive_jobs_active=False,
+        use_job_journal=False, use_bulk_status=True, seed=0):
+
+    global num_results
+    num_results = 0
+
+    backend = mock_backend.MockBackend(
+            validating_time=validating_time,
+            queued_time=mock_backend.exponential(queued_time) if queued_time > 0 else 0.0,
+            running_time=mock_backend.lognormal(running_time) if running_time > 0 else 0.0,
+            max_running_jobs=max_running_jobs, error_rate=error_rate,
+            status_error_rate=status_error_rate, status_requests_per_sec=status_requests_per_sec, seed=seed)
+
+    qc = create_circuit(num_qubits, backend)
+
+    # the size metrics transpile is not part of the job management, so is not done
+    ex.do_transpile_metrics = False
+    ex.max_jobs_active = max_jobs_active
+    ex.batch_group_jobs = batch_group_jobs
+    ex.adaptive_jobs_active = adaptive_jobs_active
+    ex.use_job_journal = use_job_journal
+    job_status.use_bulk_status = use_bulk_status
+
+    metrics.init_metrics()
+    ex.init_execution(handle_result)
+    ex.set_execution_target(backend_id=backend.name(), provider_backend=backend)
+
+    start_time = time.time()
+    start_cpu_time = time.process_time()
+
+    circuits_per_group = max(num_circuits // num_groups, 1)
+    for group in range(num_groups):
+        for circuit_id in range(circuits_per_group):
+            ex.submit_circuit(qc, group, circuit_id, num_shots)
+
+        ex.throttle_execution(completion_handler=None)
+
+    ex.finalize_execution(completion_handler=None)
+
+    wall_time = time.time() - start_time
+    cpu_time = time.process_time() - start_cpu_time
+
+    report(backend, circuits_per_group * num_groups, wall_time, cpu_time)
+
+    return backend
+
+# Report the time taken, and the delay from the completion of each job to the processing of its result
+def report(backend, num_circuits, wall_time, cpu_time):
+
+    jobs = list(backend.jobs.values())
+    job_times = [job.times["COMPLETED"] - job.times["CREATING"] for job in jobs if not job.failed]
+
+    elapsed_times = [circuit["elapsed_time"] for group in metrics.circuit_metrics.values()
+            if isinstance(group, dict) for circuit in group.values() if "fidelity" in circuit]
+
+    print(f"... circuits = {num_circuits}, jobs = {len(jobs)}, results = {num_results}, "
+            f"failed = {num_circuits - num_results}")
+    print(f"... wall time = {round(wall_time, 3)} secs, "
+            f"backend busy = {round(max([job.times['COMPLETED'] for job in jobs]) - min([job.times['CREATING'] for job in jobs]), 3)} secs")
+    print(f"... cpu time = {round(cpu_time, 3)} secs, per circuit = {round(cpu_time / max(num_circuits, 1) * 1000, 3)} ms")
+
+    # the elapsed time of a circuit runs from the launch of its job until its result is processed
+    if len(job_times) > 0 and len(elapsed_times) > 0:
+        delay = sum(elapsed_times) / len(elapsed_times) - sum(job_times) / len(job_times)
+        print(f"... avg delay from job completion to result processed = {round(delay * 1000, 3)} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the overhead of the job management with the mock backend")
+    parser.add_argument("--circuits", type=int, default=2000, help="number of circuits submitted")
+    parser.add_argument("--groups", type=int, default=10, help="number of groups the circuits are submitted in")
+    parser.add_argument("--qubits", type=int, default=5, help="number of qubits of each circuit")
+    parser.add_argument("--shots", type=int, default=100, help="number of shots of each circuit")
+    parser.add_argument("--max-jobs-active", type=int, default=20, help="maximum number of active jobs")
+    parser.add_argument("--validating-time", type=float, default=0.0, help="secs each job is validating")
+    parser.add_argument("--queued-time", type=float, default=0.05, help="mean secs each job is queued (exponential)")
+    parser.add_argument("--running-time", type=float, default=0.02, help="median secs each job is running (lognormal)")
+    parser.add_argument("--max-running-jobs", type=int, default=None, help="number of jobs the backend runs at once")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of jobs that fail")
+    parser.add_argument("--status-error-rate", type=float, default=0.0, help="fraction of status requests that fail")
+    parser.add_argument("--status-rate", type=float, default=None, help="status requests allowed per sec, as by a provider")
+    parser.add_argument("--batch-group-jobs", action="store_true", help="pack the circuits of each group into group jobs")
+    parser.add_argument("--adaptive", action="store_true", help="adapt the maximum number of active jobs")
+    parser.add_argument("--journal", action="store_true", help="record the jobs in the job journal")
+    parser.add_argument("--no-bulk-status", action="store_true", help="request the status of each job separately")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the mock backend")
+    args = parser.parse_args()
+
+    run(num_circuits=args.circuits, num_groups=args.groups, num_qubits=args.qubits, num_shots=args.shots,
+            max_jobs_active=args.max_jobs_active, validating_time=args.validating_time,
+            queued_time=args.queued_time, running_time=args.running_time,
+            max_running_jobs=args.max_running_jobs, error_rate=args.error_rate,
+            status_error_rate=args.status_error_rate, status_requests_per_sec=args.status_rate,
+            batch_group_jobs=args.batch_group_jobs,
+            adaptive_jobs_active=args.adaptive, use_job_journal=args.journal,
+            use_bulk_status=not args.no_bulk_status, seed=args.seed)
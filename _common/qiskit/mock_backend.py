@@ -0,0 +1,246 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Mock Backend Module - Qiskit
+#
+# This module provides a fake provider backend, for testing the job management of the execute module
+# offline, without a cloud queue. Its jobs go through the VALIDATING, QUEUED and RUNNING states to DONE
+# or ERROR, taking times drawn from configurable distributions, and return synthetic counts.
+# No circuit is simulated, so thousands of jobs can be executed quickly.
+#
+# The time spent in each state is given as a number of secs, or a function returning a random
+# number of secs, such as those returned by uniform(), exponential() and lognormal() below.
+# At most max_running_jobs jobs run at the same time, with the others queued until a slot is free,
+# so the backend has a limited throughput, as a real device does.
+#
+# Example usage:
+#   import mock_backend
+#   backend = mock_backend.MockBackend(queued_time=mock_backend.exponential(2.0),
+#           running_time=mock_backend.uniform(0.5, 1.0), max_running_jobs=4, error_rate=0.01)
+#   ex.set_execution_target(backend_id="mock_backend", provider_backend=backend)
+#
+# See load_test.py for a program that measures the overhead of the job management with it.
+#
+
+import time
+import uuid
+from datetime import datetime, timezone
+from collections import namedtuple
+
+import numpy as np
+
+from qiskit.providers import BackendV1, JobV1, Options
+from qiskit.providers.jobstatus import JobStatus
+from qiskit.providers.models import QasmBackendConfiguration
+from qiskit.result import Result
+
+# Return a distribution of times uniform between low and high secs
+def uniform(low, high):
+    return lambda rng: rng.uniform(low, high)
+
+# Return a distribution of times exponential with the given mean secs
+def exponential(mean):
+    return lambda rng: rng.exponential(mean)
+
+# Return a distribution of times lognormal with the given median secs, and sigma of the log of the times
+def lognormal(median, sigma=0.5):
+    return lambda rng: median * rng.lognormal(0.0, sigma)
+
+# Job limit reported by the backend, as by provider backends (see concurrency module)
+JobLimit = namedtuple("JobLimit", ["maximum_jobs", "active_jobs"])
+
+# A fake remote backend, whose jobs change state over time and return synthetic counts
+class MockBackend(BackendV1):
+
+    # validating_time, queued_time, running_time: secs in each state, or a function of a numpy Generator
+    # returning the secs; the running time is increased by time_per_shot secs for each shot
+    # max_running_jobs: number of jobs that run at the same time, None = no limit
+    # max_jobs: number of jobs reported by job_limit() as allowed at the same time, None = no limit
+    # error_rate: fraction of jobs that end in the ERROR state
+    # status_error_rate: fraction of status requests that fail (raise an exception), as a network error would
+    # status_requests_per_sec, status_request_burst: rate limit of status requests declared to the job_status
+    #     module, as by a provider; None = no limit, as the requests are not round trips to a provider
+    # num_outcomes: maximum number of distinct measurement outcomes in the counts of a circuit
+    # seed: seed of the random times, failures and counts, for reproducible tests
+    def __init__(self, name="mock_backend", num_qubits=32,
+            validating_time=0.0, queued_time=0.0, running_time=0.1, time_per_shot=0.0,
+            max_running_jobs=None, max_jobs=None, error_rate=0.0, status_error_rate=0.0,
+            status_requests_per_sec=None, status_request_burst=10,
+            num_outcomes=16, max_shots=100000, max_experiments=300, seed=None):
+
+        configuration = QasmBackendConfiguration(
+            backend_name=name, backend_version="1.0.0", n_qubits=num_qubits,
+            basis_gates=["id", "rz", "sx", "x", "cx", "reset"], gates=[],
+            local=False, simulator=False, conditional=False, open_pulse=False, memory=False,
+            max_shots=max_shots, coupling_map=None, max_experiments=max_experiments)
+        super().__init__(configuration)
+
+        self.validating_time = validating_time
+        self.queued_time = queued_time
+        self.running_time = running_time
+        self.time_per_shot = time_per_shot
+        self.max_running_jobs = max_running_jobs
+        self.max_jobs = max_jobs
+        self.error_rate = error_rate
+        self.status_error_rate = status_error_rate
+        self.status_requests_per_sec = status_requests_per_sec
+        self.status_request_burst = status_request_burst
+        self.num_outcomes = num_outcomes
+
+        self.rng = np.random.default_rng(seed)
+
+        # times at which each of the running slots becomes free
+        self.slot_free_times = []
+
+        # all jobs run on the backend, keyed by job id
+        self.jobs = {}
+
+    @classmethod
+    def _default_options(cls):
+        return Options(shots=1024)
+
+    # Run one circuit or a list of circuits as a job, returning the job
+    def run(self, run_input, **options):
+
+        circuits = run_input if isinstance(run_input, list) else [run_input]
+        shots = options.get("shots", self.options.shots)
+
+        # draw the time the job spends in each state, from its creation now
+        create_time = time.time()
+        validating_time = self.sample(self.validating_time)
+        queued_time = self.sample(self.queued_time)
+        running_time = self.sample(self.running_time) + self.time_per_shot * shots * len(circuits)
+
+        # the job starts running when it has been queued and a running slot is free
+        start_time = create_time + validating_time + queued_time
+        if self.max_running_jobs != None:
+            if len(self.slot_free_times) < self.max_running_jobs:
+                self.slot_free_times.append(0.0)
+            slot = int(np.argmin(self.slot_free_times))
+            start_time = max(start_time, self.slot_free_times[slot])
+            self.slot_free_times[slot] = start_time + running_time
+
+        times = { "CREATING": create_time, "VALIDATING": create_time,
+                "QUEUED": create_time + validating_time, "RUNNING": start_time,
+                "COMPLETED": start_time + running_time }
+
+        failed = self.rng.random() < self.error_rate
+
+        job = MockJob(self, str(uuid.uuid4()), circuits, shots, times, failed)
+        self.jobs[job.job_id()] = job
+
+        return job
+
+    # Return a number of secs, given as a number or a distribution
+    def sample(self, value):
+        return max(float(value(self.rng)), 0.0) if callable(value) else float(value)
+
+    # Return the job with the given id, as a provider backend does
+    def retrieve_job(self, job_id):
+        return self.jobs[job_id]
+
+    # Return the statuses of the jobs with the given ids, keyed by job id, obtained in one request
+    def job_statuses(self, job_ids):
+        self.check_status_request()
+        return { job_id: self.jobs[job_id].current_status() for job_id in job_ids if job_id in self.jobs }
+
+    # Raise an exception for the given fraction of status requests
+    def check_status_request(self):
+        if self.rng.random() < self.status_error_rate:
+            raise RuntimeError("mock status request failure")
+
+    # Return the number of jobs allowed and active, as a provider backend does
+    def job_limit(self):
+        now = time.time()
+        active_jobs = len([job for job in self.jobs.values() if job.times["COMPLETED"] > now])
+        return JobLimit(self.max_jobs, active_jobs)
+
+    # Return synthetic counts for a circuit, over a few random outcomes of its classical bits, as hex keys
+    def synthetic_counts(self, num_clbits, shots):
+        num_outcomes = min(2 ** min(num_clbits, 62), self.num_outcomes)
+        outcomes = self.rng.integers(0, 2 ** min(num_clbits, 62), size=num_outcomes)
+
+        counts = {}
+        for outcome, count in zip(outcomes, self.rng.multinomial(shots, [1.0 / num_outcomes] * num_outcomes)):
+            if count > 0:
+                counts[hex(int(outcome))] = counts.get(hex(int(outcome)), 0) + int(count)
+        return counts
+
+# A job of the mock backend, whose state is determined by the time since it was created
+class MockJob(JobV1):
+
+    def __init__(self, backend, job_id, circuits, shots, times, failed):
+        super().__init__(backend, job_id)
+        self.circuits = circuits
+        self.shots = shots
+        self.times = times
+        self.failed = failed
+        self._result = None
+
+    def submit(self):
+        pass
+
+    def status(self):
+        self.backend().check_status_request()
+        return self.current_status()
+
+    # Return the status of the job at the current time
+    def current_status(self):
+        now = time.time()
+        if now < self.times["QUEUED"]:
+            return JobStatus.VALIDATING
+        if now < self.times["RUNNING"]:
+            return JobStatus.QUEUED
+        if now < self.times["COMPLETED"]:
+            return JobStatus.RUNNING
+
+        return JobStatus.ERROR if self.failed else JobStatus.DONE
+
+    def error_message(self):
+        return "mock job failure" if self.failed else None
+
+    # Return the time at which the job entered each state, as IBMQ jobs do
+    def time_per_step(self):
+        return { step: datetime.fromtimestamp(t, timezone.utc) for step, t in self.times.items() }
+
+    # Return the result of the job, waiting until it is complete
+    def result(self, timeout=None):
+        wait_time = self.times["COMPLETED"] - time.time()
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+        if self.failed:
+            raise RuntimeError(f"mock job {self.job_id()} failed")
+
+        if self._result is None:
+            self._result = self.build_result()
+        return self._result
+
+    def build_result(self):
+        running_time = self.times["COMPLETED"] - self.times["RUNNING"]
+
+        results = []
+        for qc in self.circuits:
+            counts = self.backend().synthetic_counts(qc.num_clbits, self.shots)
+            header = { "name": qc.name, "memory_slots": qc.num_clbits, "n_qubits": qc.num_qubits,
+                    "creg_sizes": [[creg.name, creg.size] for creg in qc.cregs],
+                    "clbit_labels": [[creg.name, i] for creg in qc.cregs for i in range(creg.size)] }
+            results.append({ "shots": self.shots, "success": True, "header": header,
+                    "data": { "counts": counts }, "time_taken": running_time / len(self.circuits) })
+
+        return Result.from_dict({ "backend_name": self.backend().name(), "backend_version": "1.0.0",
+                "qobj_id": self.job_id(), "job_id": self.job_id(), "success": True,
+                "results": results, "time_taken": running_time })
@@ -0,0 +1,129 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Suite Module - Qiskit
+#
+# This module runs a suite of benchmark apps at the same time, so the backend is kept busy
+# for the whole suite, instead of draining at the end of each app while its last group completes.
+# Each app is run in its own process, with its own execute and metrics module state, so the
+# metrics of each app are kept separate. The apps share a single limit on the number of active jobs,
+# and serialize their updates to the shared data file.
+#
+# Example usage (from the top level directory, as in the benchmark notebooks):
+#   import suite
+#   suite.run_suite([
+#       ("deutsch-jozsa/qiskit", "dj_benchmark", { "min_qubits":2, "max_qubits":8 }),
+#       ("bernstein-vazirani/qiskit", "bv_benchmark", { "min_qubits":2, "max_qubits":8, "method":1 }),
+#       ("quantum-fourier-transform/qiskit", "qft_benchmark", { "min_qubits":2, "max_qubits":8 }),
+#   ], max_jobs_active=5)
+#
+# The arguments of each app's run() method are passed to the app's process, so they must be
+# picklable; use backend_id, hub, group and project to select a provider backend,
+# as a provider_backend object usually cannot be passed to another process.
+#
+
+import os
+import sys
+import time
+import importlib
+import multiprocessing
+import multiprocessing.connection
+
+# Print progress of the apps in the suite
+verbose = True
+
+# Run the given benchmark apps at the same time, with at most max_jobs_active jobs active across all apps
+# Each app is given as a tuple of (app directory, benchmark module name, dict of arguments to its run method)
+# Settings of the execute module (e.g. { "batch_group_jobs": True }) may be given, to be applied in each app
+# At most max_concurrent_apps apps are run at the same time, None = run all apps at once
+# Returns a dict of the exit code of each app's process, keyed by module name
+def run_suite(apps, max_jobs_active=5, max_concurrent_apps=None, exec_settings=None):
+
+    # processes are started with spawn, as forking a process with active simulator threads is unsafe
+    context = multiprocessing.get_context("spawn")
+
+    # the active job limit and the data file lock are shared by all the apps
+    job_slots = context.Semaphore(max_jobs_active)
+    data_file_lock = context.Lock()
+
+    if max_concurrent_apps == None:
+        max_concurrent_apps = len(apps)
+
+    pending_apps = list(apps)
+    running_apps = {}
+    exit_codes = {}
+
+    start_time = time.time()
+
+    while len(pending_apps) > 0 or len(running_apps) > 0:
+
+        # start as many of the pending apps as allowed
+        while len(pending_apps) > 0 and len(running_apps) < max_concurrent_apps:
+            app_path, module_name, run_args = pending_apps.pop(0)
+
+            process = context.Process(target=run_app, name=module_name,
+                    args=(app_path, module_name, run_args, job_slots, data_file_lock,
+                            max_jobs_active, exec_settings))
+            process.start()
+            running_apps[process] = module_name
+
+            if verbose:
+                print(f"... started app {module_name}, pid = {process.pid}")
+
+        # wait for any of the running apps to finish
+        multiprocessing.connection.wait([process.sentinel for process in running_apps])
+
+        for process in list(running_apps):
+            if not process.is_alive():
+                module_name = running_apps.pop(process)
+                process.join()
+                exit_codes[module_name] = process.exitcode
+
+                if process.exitcode != 0:
+                    print(f"ERROR: app {module_name} failed, exit code = {process.exitcode}")
+                elif verbose:
+                    print(f"... finished app {module_name}")
+
+    if verbose:
+        print(f"... suite completed in {round(time.time() - start_time, 3)} secs")
+
+    return exit_codes
+
+# Run one benchmark app, sharing the active job limit and data file lock with the other apps
+# This is executed in the app's own process
+def run_app(app_path, module_name, run_args, job_slots, data_file_lock, max_jobs_active, exec_settings=None):
+
+    # plots are drawn without a display, and saved as images, as they cannot be shown from this process
+    os.environ["MPLBACKEND"] = "Agg"
+
+    sys.path[1:1] = [ app_path ]
+
+    # the benchmark module is imported first, so that the execute and metrics modules are those found
+    # on the paths it adds, as when it is run on its own, and are set up here before it runs
+    module = importlib.import_module(module_name)
+
+    import execute as ex
+    import metrics
+
+    ex.shared_job_slots = job_slots
+    ex.max_jobs_active = max_jobs_active
+    metrics.data_file_lock = data_file_lock
+
+    if exec_settings != None:
+        for name, value in exec_settings.items():
+            setattr(ex, name, value)
+
+    module.run(**run_args)
@@ -0,0 +1,263 @@
+# (C) Quantum Economic Development Consortium (QED-C) 2021.
+# Technical Advisory Committee on Standards and Benchmarks (TAC)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+###########################
+# Tracing Module
+#
+# This module records the time spent in each stage of running a benchmark, as spans tagged with the app,
+# group and circuit id, so it can be seen where each benchmark's wall time goes.
+# The stages recorded are:
+#   create, decompose             - creating the circuit in the benchmark, and decomposing it before submitting
+#   metrics-transpile, transpile  - the transpile for size metrics, and for execution
+#   transformer                   - the transformer execution option
+#   exact, density_matrix         - computing the exact result of a circuit, in place of running a job
+#   queue                         - waiting for a free job slot, from submit to launch of the job
+#   submit, run                   - launching the job on the backend, and from launch until it is complete
+#   result                        - fetching the job result
+#   result_handler                - the benchmark's result handler, that computes the fidelity
+#   aggregate, plot               - aggregating the metrics of a group, and plotting the app's metrics
+#
+# Tracing is off by default; when on, the spans can be exported as Chrome trace-event JSON
+# (viewed in chrome://tracing or https://ui.perfetto.dev), or as a flat CSV file:
+#   tracing.enabled = True
+#   ... run benchmarks ...
+#   tracing.report_spans()
+#   tracing.export_chrome_trace("__data/TRACE.json")
+#   tracing.export_csv("__data/TRACE.csv")
+#
+
+import os
+import csv
+import json
+import time
+import functools
+import threading
+
+# Option to record spans
+enabled = False
+
+# App tag of the spans recorded, set when an app starts executing
+app = None
+
+# Spans recorded, as dicts of name, app, group, circuit, start and end time, lane and args
+spans = []
+
+# Lock held when recording a span, as spans are recorded from completion threads too
+spans_lock = threading.Lock()
+
+# Group and circuit id of the circuit being processed in each thread, the default tags of its spans
+context = threading.local()
+
+# Set the app tag of the spans recorded from now on
+def set_app(app_name):
+    global app
+    app = app_name
+
+# Set the group and circuit id of the circuit being processed in this thread, None when done with it
+def set_circuit(group, circuit):
+    context.group = group
+    context.circuit = circuit
+
+# Remove all recorded spans
+def clear_spans():
+    with spans_lock:
+        spans.clear()
+    create_end_times.clear()
+    created_circuits.clear()
+
+# Record a span whose start and end times are known, e.g. obtained from timestamps already taken
+# The lane groups spans in the trace view; by default, the spans of each thread are in one lane
+def record_span(name, start_time, end_time, group=None, circuit=None, lane=None, **args):
+    if not enabled:
+        return
+
+    span = { "name": name, "app": app,
+            "group": None if group == None else str(group),
+            "circuit": None if circuit == None else str(circuit),
+            "start": start_time, "end": end_time,
+            "lane": lane if lane != None else threading.current_thread().name,
+            "args": args }
+
+    with spans_lock:
+        spans.append(span)
+
+# A span recorded from entry to exit of a with statement
+class Span:
+
+    def __init__(self, name, group, circuit, args):
+        self.name = name
+        self.group = group
+        self.circuit = circuit
+        self.args = args
+
+    def __enter__(self):
+        self.start_time = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type != None:
+            self.args["error"] = exc_type.__name__
+        record_span(self.name, self.start_time, time.time(), self.group, self.circuit, **self.args)
+        return False
+
+# A span that records nothing, used when tracing is off
+class NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+null_span = NullSpan()
+
+# Return a span to be recorded with a with statement, e.g.
+#   with tracing.span("transpile", group, circuit):
+#       ...
+# If no group is given, the span is tagged with the circuit being processed (see set_circuit)
+def span(name, group=None, circuit=None, **args):
+    if not enabled:
+        return null_span
+    if group == None:
+        group = getattr(context, "group", None)
+        circuit = getattr(context, "circuit", None)
+    return Span(name, group, circuit, args)
+
+# Decorator that records a span for each call of a function
+# If group_arg is given, the positional argument at that index is the group of the span
+def traced(name, group_arg=None):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            group = args[group_arg] if group_arg != None and len(args) > group_arg else None
+            with Span(name, group, None, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# End times of the circuits created, keyed by group and circuit id, until they are submitted
+create_end_times = {}
+
+# Group and circuit ids of the circuits whose create span was recorded by record_created
+created_circuits = set()
+
+# Record the span of creating a circuit, when the benchmark stores its create_time metric
+# The benchmark stores the metric as soon as the circuit is created, so the span ends now
+def record_create(group, circuit, create_time):
+    if not enabled:
+        return
+    key = (str(group), str(circuit))
+    if key in created_circuits:
+        created_circuits.discard(key)
+        return
+    end_time = time.time()
+    create_end_times[key] = end_time
+    record_span("create", end_time - create_time, end_time, group, circuit)
+
+# Record the spans of creating and decomposing a circuit, from the times they started and ended, in the
+# given lane, for a circuit created before it is submitted (see pipeline module); the spans are not
+# recorded again when its create_time metric is stored, or when it is submitted
+def record_created(group, circuit, start_time, create_end_time, decompose_end_time, lane=None):
+    if not enabled:
+        return
+    created_circuits.add((str(group), str(circuit)))
+    record_span("create", start_time, create_end_time, group, circuit, lane=lane)
+    record_span("decompose", create_end_time, decompose_end_time, group, circuit, lane=lane)
+
+# Record the span of decomposing a circuit, when it is submitted for execution at the given time
+# The benchmarks decompose the circuit between creating and submitting it, so the span is the time between
+def record_decompose(group, circuit, end_time):
+    if not enabled:
+        return
+    create_end_time = create_end_times.pop((str(group), str(circuit)), None)
+    if create_end_time != None:
+        record_span("decompose", create_end_time, end_time, group, circuit)
+
+# Return the recorded spans, of the given app only if not None
+def get_spans(app_name=None):
+    with spans_lock:
+        return [span for span in spans if app_name == None or span["app"] == app_name]
+
+# Print the total time and number of spans of each stage, for each app
+# Spans of jobs executed at the same time overlap, so the totals may exceed the wall time
+def report_spans(app_name=None):
+
+    totals = {}
+    for span in get_spans(app_name):
+        stage = totals.setdefault(span["app"], {}).setdefault(span["name"], [0.0, 0])
+        stage[0] += span["end"] - span["start"]
+        stage[1] += 1
+
+    for app_tag, stages in totals.items():
+        print(f"... trace of app {app_tag}")
+        for name, (total, count) in sorted(stages.items(), key=lambda stage: -stage[1][0]):
+            print(f"    {name:18s} total = {round(total, 3)} secs, count = {count}, avg = {round(total / count, 4)}")
+
+# Export the recorded spans as a Chrome trace-event JSON file
+# Each app is shown as a process, and each lane (thread or job) as a thread of it
+def export_chrome_trace(filename="__data/TRACE.json", app_name=None):
+
+    recorded = get_spans(app_name)
+    origin = min([span["start"] for span in recorded], default=0)
+
+    events = []
+    pids = {}
+    tids = {}
+
+    for span in recorded:
+
+        # number the apps and lanes in the order they are first seen, naming them with metadata events
+        if span["app"] not in pids:
+            pids[span["app"]] = len(pids) + 1
+            events.append({ "name": "process_name", "ph": "M", "pid": pids[span["app"]], "tid": 0,
+                    "args": { "name": str(span["app"]) } })
+        pid = pids[span["app"]]
+
+        if (pid, span["lane"]) not in tids:
+            tids[(pid, span["lane"])] = len(tids) + 1
+            events.append({ "name": "thread_name", "ph": "M", "pid": pid, "tid": tids[(pid, span["lane"])],
+                    "args": { "name": span["lane"] } })
+
+        args = { "group": span["group"], "circuit": span["circuit"] }
+        args.update(span["args"])
+
+        events.append({ "name": span["name"], "cat": "benchmark", "ph": "X",
+                "ts": round((span["start"] - origin) * 1e6, 1),
+                "dur": round((span["end"] - span["start"]) * 1e6, 1),
+                "pid": pid, "tid": tids[(pid, span["lane"])], "args": args })
+
+    make_parent_dir(filename)
+    with open(filename, "w") as f:
+        json.dump({ "traceEvents": events, "displayTimeUnit": "ms" }, f, default=str)
+
+# Export the recorded spans as a flat CSV file, one row per span, with times in secs
+def export_csv(filename="__data/TRACE.csv", app_name=None):
+
+    make_parent_dir(filename)
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([ "app", "name", "group", "circuit", "start", "end", "duration", "lane", "args" ])
+
+        for span in get_spans(app_name):
+            writer.writerow([ span["app"], span["name"], span["group"], span["circuit"],
+                    round(span["start"], 6), round(span["end"], 6), round(span["end"] - span["start"], 6),
+                    span["lane"], json.dumps(span["args"], default=str) if len(span["args"]) > 0 else "" ])
+
+def make_parent_dir(filename):
+    dirname = os.path.dirname(filename)
+    if dirname != "" and not os.path.exists(dirname):
+        os.makedirs(dirname)
@@ -13,6 +13,7 @@ sys.path[1:1] = ["_common", "_common/qiskit", "quantum-fourier-transform/qiskit"
 sys.path[1:1] = ["../../_common", "../../_common/qiskit", "../../quantum-fourier-transform/qiskit"]
 import execute as ex
 import metrics as metrics
+import pipeline
 from qft_benchmark import inv_qft_gate
 
 np.random.seed(0)
@@ -251,12 +252,12 @@ def run(min_qubits=3, max_qubits=8, max_circuits=3, num_shots=2500,
     ex.set_execution_target(backend_id, provider_backend=provider_backend,
             hub=hub, group=group, project=project, exec_options=exec_options)
 
-    # Execute Benchmark Program N times for multiple circuit sizes
-    # Accumulate metrics asynchronously as circuits complete
-    for num_qubits in range(min_qubits, max_qubits + 1):
+    # Create the circuits for one circuit size, and yield them as (s_int, circuit created with its create time)
+    # With pipelining, the circuits are created in a background thread while the previous size executes
+    def create_group(num_qubits):
 
-        # reset random seed
-        np.random.seed(0)
+        # reset random seed, of a generator for this group, as it may be created in the background
+        rng = np.random.RandomState(0)
         
         # as circuit width grows, the number of counting qubits is increased
         num_counting_qubits = num_qubits - num_state_qubits - 1
@@ -264,29 +265,36 @@ def run(min_qubits=3, max_qubits=8, max_circuits=3, num_shots=2500,
         # determine number of circuits to execute for this group
         num_circuits = min(2 ** (num_counting_qubits), max_circuits)
         
-        print(f"************\nExecuting [{num_circuits}] circuits with num_qubits = {num_qubits}")
-        
         # determine range of secret strings to loop over
         if 2**(num_counting_qubits) <= max_circuits:
             s_range = list(range(num_circuits))
         else:
-            s_range = np.random.choice(2**(num_counting_qubits), num_circuits, False)
+            s_range = rng.choice(2**(num_counting_qubits), num_circuits, False)
         
         # loop over limited # of secret strings for this
         for s_int in s_range:
-            # create the circuit for given qubit size and secret string, store time metric
-            ts = time.time()
-
-            a_ = a_from_s_int(s_int, num_counting_qubits)
+            # create the circuit for given qubit size and secret string, with its create time
+            # and collapse the 3 sub-circuit levels used in this benchmark (for qiskit)
+            created = pipeline.create_circuit(
+                    lambda: AmplitudeEstimation(num_state_qubits, num_counting_qubits,
+                            a_from_s_int(s_int, num_counting_qubits)),
+                    lambda qc: qc.decompose().decompose().decompose())
+            
+            yield s_int, created
 
-            qc = AmplitudeEstimation(num_state_qubits, num_counting_qubits, a_)
-            metrics.store_metric(num_qubits, s_int, 'create_time', time.time() - ts)
+    # Execute Benchmark Program N times for multiple circuit sizes
+    # Accumulate metrics asynchronously as circuits complete
+    for num_qubits, circuits in pipeline.pipelined(range(min_qubits, max_qubits + 1), create_group):
 
-            # collapse the 3 sub-circuit levels used in this benchmark (for qiskit)
-            qc2 = qc.decompose().decompose().decompose()
+        num_circuits = min(2 ** (num_qubits - num_state_qubits - 1), max_circuits)
+        print(f"************\nExecuting [{num_circuits}] circuits with num_qubits = {num_qubits}")
+        
+        # submit circuits for execution on target (simulator, cloud simulator, or hardware)
+        for s_int, created in circuits:
+            # store time metric
+            pipeline.store_created(num_qubits, s_int, created)
             
-            # submit circuit for execution on target (simulator, cloud simulator, or hardware)
-            ex.submit_circuit(qc2, num_qubits, s_int, num_shots)
+            ex.submit_circuit(created["qc"], num_qubits, s_int, num_shots)
 
         # Wait for some active circuits to complete; report metrics when groups complete
         ex.throttle_execution(metrics.finalize_group)
@@ -18,6 +18,7 @@ sys.path[1:1] = ["../../_common", "../../_common/qiskit", "../../monte-carlo/_co
 import execute as ex
 import mc_utils as mc_utils
 import metrics as metrics
+import pipeline
 from qft_benchmark import inv_qft_gate
 
 np.random.seed(0)
@@ -395,12 +396,12 @@ def run(min_qubits=MIN_QUBITS, max_qubits=10, max_circuits=1, num_shots=2500,
     ex.set_execution_target(backend_id, provider_backend=provider_backend,
             hub=hub, group=group, project=project, exec_options=exec_options)
 
-    # Execute Benchmark Program N times for multiple circuit sizes
-    # Accumulate metrics asynchronously as circuits complete
-    for num_qubits in range(min_qubits, max_qubits + 1):
+    # Create the circuits for one circuit size, and yield them as (mu, circuit created with its create time)
+    # With pipelining, the circuits are created in a background thread while the previous size executes
+    def create_group(num_qubits):
 
-        # reset random seed
-        np.random.seed(0)
+        # reset random seed, of a generator for this group, as it may be created in the background
+        rng = np.random.RandomState(0)
 
         input_size = num_qubits - 1 # TODO: keep using inputsize? only used in num_circuits
         
@@ -410,34 +411,42 @@ def run(min_qubits=MIN_QUBITS, max_qubits=10, max_circuits=1, num_shots=2500,
         # determine number of circuits to execute for this group
         num_circuits = min(2 ** (input_size), max_circuits)
 
-        print(f"************\nExecuting [{num_circuits}] circuits with num_qubits = {num_qubits}")
-
         # determine range of circuits to loop over for method 1
         if 2**(input_size) <= max_circuits:
             mu_range = [i/2**(input_size) for i in range(num_circuits)]
         else:
-            mu_range = [i/2**(input_size) for i in np.random.choice(2**(input_size), num_circuits, False)]
+            mu_range = [i/2**(input_size) for i in rng.choice(2**(input_size), num_circuits, False)]
 
         # loop over limited # of mu values for this
         for mu in mu_range:
             target_dist = p_distribution(num_state_qubits, mu)
             f_to_estimate = functools.partial(f_of_X, num_state_qubits=num_state_qubits)
             
-            # create the circuit for given qubit size and secret string, store time metric
-            ts = time.time()
-
-            qc = MonteCarloSampling(target_dist, f_to_estimate, num_state_qubits, num_counting_qubits, epsilon, degree, method=method)
-            metrics.store_metric(num_qubits, mu, 'create_time', time.time() - ts)
-            
-            # collapse the 4 sub-circuit levels used in this benchmark (for qiskit)
-            qc2 = qc.decompose().decompose().decompose().decompose()
+            # create the circuit for given qubit size and secret string, with its create time
+            # and collapse the 4 sub-circuit levels used in this benchmark (for qiskit)
+            created = pipeline.create_circuit(
+                    lambda: MonteCarloSampling(target_dist, f_to_estimate, num_state_qubits, num_counting_qubits, epsilon, degree, method=method),
+                    lambda qc: qc.decompose().decompose().decompose().decompose())
                 
-            # submit circuit for execution on target (simulator, cloud simulator, or hardware)
-            ex.submit_circuit(qc2, num_qubits, mu, num_shots)
+            yield mu, created
 
             # if method is 2, we only have one type of circuit, so break out of loop
             if method == 2:
                 break
+
+    # Execute Benchmark Program N times for multiple circuit sizes
+    # Accumulate metrics asynchronously as circuits complete
+    for num_qubits, circuits in pipeline.pipelined(range(min_qubits, max_qubits + 1), create_group):
+
+        num_circuits = min(2 ** (num_qubits - 1), max_circuits)
+        print(f"************\nExecuting [{num_circuits}] circuits with num_qubits = {num_qubits}")
+
+        # submit circuits for execution on target (simulator, cloud simulator, or hardware)
+        for mu, created in circuits:
+            # store time metric
+            pipeline.store_created(num_qubits, mu, created)
+            
+            ex.submit_circuit(created["qc"], num_qubits, mu, num_shots)
         
         # Wait for some active circuits to complete; report metrics when groups complete
         ex.throttle_execution(metrics.finalize_group)
@@ -7,6 +7,7 @@ import time
 
 import numpy as np
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+from qiskit.circuit import Parameter
 
 sys.path[1:1] = ["_common", "_common/qiskit", "quantum-fourier-transform/qiskit"]
 sys.path[1:1] = ["../../_common", "../../_common/qiskit", "../../quantum-fourier-transform/qiskit"]
@@ -25,6 +26,7 @@ U_ = None
 
 ############### Circuit Definition
 
+# theta may be a Parameter, to create a template circuit that serves all values of theta
 def PhaseEstimation(num_qubits, theta):
     
     qr = QuantumRegister(num_qubits)
@@ -125,11 +127,17 @@ def bitstring_to_theta(counts, num_counting_qubits):
 ################ Benchmark Loop
 
 # Execute program with default parameters
-def run(min_qubits=3, max_qubits=8, max_circuits=3, num_shots=2500,
+def run(min_qubits=3, max_qubits=8, max_circuits=3, num_shots=2500, use_templates=False,
         backend_id='qasm_simulator', provider_backend=None,
         hub="ibm-q", group="open", project="main", exec_options=None):
 
     print("Phase Estimation Benchmark Program - Qiskit")
+    
+    # with templates, one circuit with theta as a parameter is created for each size, and transpiled once for all thetas
+    # the size metrics of each size are those of its first circuit, bound from the template (smaller
+    # if its theta is 0, as the controlled phase gates by 0 are then removed by the transpiler)
+    if use_templates:
+        print("... using parameterized circuit templates")
 
     num_state_qubits = 1 # default, not exposed to users, cannot be changed in current implementation
 
@@ -179,19 +187,32 @@ def run(min_qubits=3, max_qubits=8, max_circuits=3, num_shots=2500,
         else:
             theta_range = [i/(2**(num_counting_qubits)) for i in np.random.choice(2**(num_counting_qubits), num_circuits, False)]
 
-        # loop over limited # of random theta choices
-        for theta in theta_range:
-            # create the circuit for given qubit size and theta, store time metric
+        # create the template circuit for this qubit size, whose create time is shared by its circuits
+        if use_templates:
             ts = time.time()
+            template = PhaseEstimation(num_qubits, Parameter("theta")).decompose().decompose().decompose()
+            template_create_time = (time.time() - ts) / num_circuits
 
-            qc = PhaseEstimation(num_qubits, theta)
-            metrics.store_metric(num_qubits, theta, 'create_time', time.time() - ts)
-
-            # collapse the 3 sub-circuit levels used in this benchmark (for qiskit)
-            qc2 = qc.decompose().decompose().decompose()
-            
-            # submit circuit for execution on target (simulator, cloud simulator, or hardware)
-            ex.submit_circuit(qc2, num_qubits, theta, num_shots)
+        # loop over limited # of random theta choices
+        for theta in theta_range:
+        
+            # submit the template bound with theta for execution on target, store time metric
+            if use_templates:
+                metrics.store_metric(num_qubits, theta, 'create_time', template_create_time)
+                ex.submit_circuit(template, num_qubits, theta, num_shots, parameter_values=[theta])
+                
+            else:
+                # create the circuit for given qubit size and theta, store time metric
+                ts = time.time()
+
+                qc = PhaseEstimation(num_qubits, theta)
+                metrics.store_metric(num_qubits, theta, 'create_time', time.time() - ts)
+
+                # collapse the 3 sub-circuit levels used in this benchmark (for qiskit)
+                qc2 = qc.decompose().decompose().decompose()
+                
+                # submit circuit for execution on target (simulator, cloud simulator, or hardware)
+                ex.submit_circuit(qc2, num_qubits, theta, num_shots)
 
         # Wait for some active circuits to complete; report metrics when groups complete
         ex.throttle_execution(metrics.finalize_group)
@@ -8,6 +8,7 @@ import time
 
 import numpy as np
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+from qiskit.circuit import ParameterVector
 
 sys.path[1:1] = [ "_common", "_common/qiskit" ]
 sys.path[1:1] = [ "../../_common", "../../_common/qiskit" ]
@@ -27,7 +28,9 @@ QFTI_ = None
 
 ############### Circuit Definition
 
-def QuantumFourierTransform (num_qubits, secret_int, method=1):
+# If template is True, the gates that depend on the secret_int take their angles from parameters
+# (see template_parameter_values), so that one circuit serves all secret_ints (methods 1 and 2 only)
+def QuantumFourierTransform (num_qubits, secret_int, method=1, template=False):
     global num_gates, depth
     # Size of input is one less than available qubits
     input_size = num_qubits
@@ -36,15 +39,25 @@ def QuantumFourierTransform (num_qubits, secret_int, method=1):
     
     # allocate qubits
     qr = QuantumRegister(num_qubits); cr = ClassicalRegister(num_qubits); qc = QuantumCircuit(qr, cr, name="main")
+    
+    if template:
+        params = ParameterVector("s", input_size)
 
     if method==1:
 
-        # Perform X on each qubit that matches a bit in secret string
-        s = ('{0:0'+str(input_size)+'b}').format(secret_int)
-        for i_qubit in range(input_size):
-            if s[input_size-1-i_qubit]=='1':
-                qc.x(qr[i_qubit])
+        # Perform RX(pi) (X up to a global phase) on each qubit, with the angle pi if it matches a bit in secret string
+        if template:
+            for i_qubit in range(input_size):
+                qc.rx(params[i_qubit], qr[i_qubit])
                 num_gates += 1
+                
+        # Perform X on each qubit that matches a bit in secret string
+        else:
+            s = ('{0:0'+str(input_size)+'b}').format(secret_int)
+            for i_qubit in range(input_size):
+                if s[input_size-1-i_qubit]=='1':
+                    qc.x(qr[i_qubit])
+                    num_gates += 1
 
         depth += 1
 
@@ -85,7 +98,7 @@ def QuantumFourierTransform (num_qubits, secret_int, method=1):
 
         for i_q in range(0, num_qubits):
             divisor = 2 ** (i_q)
-            qc.rz(secret_int * math.pi / divisor, qr[i_q])
+            qc.rz(params[i_q] if template else secret_int * math.pi / divisor, qr[i_q])
             num_gates += 1
 
         depth += 1
@@ -123,6 +136,16 @@ def QuantumFourierTransform (num_qubits, secret_int, method=1):
     # return a handle on the circuit
     return qc
 
+# Return the parameter values that make the template circuit the circuit for the given secret_int,
+# in the order of the template's parameters
+def template_parameter_values (num_qubits, secret_int, method=1):
+    
+    if method==1:
+        s = ('{0:0'+str(num_qubits)+'b}').format(secret_int)
+        return [math.pi if s[num_qubits-1-i_qubit]=='1' else 0.0 for i_qubit in range(num_qubits)]
+        
+    return [secret_int * math.pi / (2 ** i_q) for i_q in range(num_qubits)]
+    
 ############### QFT Circuit
 
 def qft_gate(input_size):
@@ -245,12 +268,20 @@ def analyze_and_print_result (qc, result, num_qubits, secret_int, num_shots, met
 
 # Execute program with default parameters
 def run (min_qubits = 2, max_qubits = 8, max_circuits = 3, num_shots = 2500,
-        method=1, 
+        method=1, use_templates=False,
         backend_id='qasm_simulator', provider_backend=None,
         hub="ibm-q", group="open", project="main", exec_options=None):
 
     print("Quantum Fourier Transform Benchmark Program - Qiskit")
     print(f"... using circuit method {method}")
+    
+    # with templates, one parameterized circuit is created for each size, and transpiled once for all
+    # secret_ints; in method 1, each qubit gets an RX whose angle selects the X of the secret string
+    # the size metrics of each size are those of its first circuit, bound from the template, which may
+    # differ slightly from those of the circuit created without a template (e.g. RX(pi) in place of X)
+    use_templates = use_templates and (method == 1 or method == 2)
+    if use_templates:
+        print("... using parameterized circuit templates")
 
     # validate parameters (smallest circuit is 2 qubits)
     max_qubits = max(2, max_qubits)
@@ -306,20 +337,36 @@ def run (min_qubits = 2, max_qubits = 8, max_circuits = 3, num_shots = 2500,
 
         print(f"************\nExecuting [{num_circuits}] circuits with num_qubits = {num_qubits}")
         
+        # create the template circuit for this qubit size, whose create time is shared by its circuits
+        if use_templates:
+            ts = time.time()
+            template = QuantumFourierTransform(num_qubits, None, method=method, template=True).decompose()
+            template_create_time = (time.time() - ts) / num_circuits
+        
         # loop over limited # of secret strings for this
         for s_int in s_range:
 
-            # create the circuit for given qubit size and secret string, store time metric
-            ts = time.time()
-            qc = QuantumFourierTransform(num_qubits, s_int, method=method)
-            metrics.store_metric(input_size, s_int, 'create_time', time.time()-ts)
+            # obtain the parameter values of the template for the given secret string, store time metric
+            if use_templates:
+                ts = time.time()
+                parameter_values = template_parameter_values(num_qubits, s_int, method=method)
+                metrics.store_metric(input_size, s_int, 'create_time', template_create_time + time.time()-ts)
+                
+                # submit the template bound with the values for execution on target
+                ex.submit_circuit(template, input_size, s_int, num_shots, parameter_values=parameter_values)
+                
+            else:
+                # create the circuit for given qubit size and secret string, store time metric
+                ts = time.time()
+                qc = QuantumFourierTransform(num_qubits, s_int, method=method)
+                metrics.store_metric(input_size, s_int, 'create_time', time.time()-ts)
 
-            # collapse the sub-circuits used in this benchmark (for qiskit)
-            qc2 = qc.decompose()
-            
-            # submit circuit for execution on target (simulator, cloud simulator, or hardware)
+                # collapse the sub-circuits used in this benchmark (for qiskit)
+                qc2 = qc.decompose()
+                
+                # submit circuit for execution on target (simulator, cloud simulator, or hardware)
 
-            ex.submit_circuit(qc2, input_size, s_int, num_shots)
+                ex.submit_circuit(qc2, input_size, s_int, num_shots)
         
         print(f"... number of gates, depth = {num_gates}, {depth}")
         
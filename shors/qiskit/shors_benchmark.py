@@ -2,6 +2,7 @@
 Shor's Order Finding Algorithm Benchmark - Qiskit
 """
 
+import functools
 import math
 import sys
 import time
@@ -13,6 +14,7 @@ sys.path[1:1] = ["_common", "_common/qiskit", "shors/_common", "quantum-fourier-
 sys.path[1:1] = ["../../_common", "../../_common/qiskit", "../../shors/_common", "../../quantum-fourier-transform/qiskit"]
 import execute as ex
 import metrics as metrics
+import pipeline
 from shors_utils import getAngles, getAngle, modinv, generate_base, verify_order
 from qft_benchmark import inv_qft_gate
 from qft_benchmark import qft_gate
@@ -334,6 +336,22 @@ def analyze_and_print_result(qc, result, num_qubits, order, num_shots, method):
         
 #################### Benchmark Loop        
 
+# Create the circuit for given order, decomposed, with its create time (see pipeline module)
+def create_circuit(number_order, base, method, verbose=verbose):
+
+    # collapse the 4 sub-circuit levels used in this benchmark (for qiskit)
+    return pipeline.create_circuit(
+            lambda: ShorsAlgorithm(number_order[0], base, method=method, verbose=verbose),
+            lambda qc: qc.decompose().decompose().decompose().decompose())
+
+# Create the circuit for given qubit size and order, store time metric, and return it decomposed
+# This is called by the execute module when the circuit's job is launched
+def create_circuit_on_launch(num_qubits, number_order, base, method, verbose=verbose):
+
+    created = create_circuit(number_order, base, method, verbose)
+    pipeline.store_created(num_qubits, number_order, created)
+    return created["qc"]
+
 # Execute program with default parameters
 def run (min_qubits=3, max_circuits=1, max_qubits=18, num_shots=2500, method = 1,
         verbose=verbose, backend_id='qasm_simulator', provider_backend=None,
@@ -378,9 +396,14 @@ def run (min_qubits=3, max_circuits=1, max_qubits=18, num_shots=2500, method = 1
     ex.set_execution_target(backend_id, provider_backend=provider_backend,
             hub=hub, group=group, project=project, exec_options=exec_options)
  
-    # Execute Benchmark Program N times for multiple circuit sizes
-    # Accumulate metrics asynchronously as circuits complete
-    for num_qubits in range(min_qubits, max_qubits + 1, qubit_multiple):
+    # random generator of the numbers and orders, for all circuit sizes, as they may be created in the background
+    rng = np.random.RandomState(0)
+    
+    # Generate the circuits for one circuit size, and yield them as (number_order, circuit)
+    # Each circuit is created only when its job is launched, so the circuits waiting for a job are not held;
+    # with pipelining, the circuits are instead created (with their create time) in a background thread
+    # while the previous size executes
+    def create_group(num_qubits):
 
         input_size = num_qubits - 1
 
@@ -390,16 +413,14 @@ def run (min_qubits=3, max_circuits=1, max_qubits=18, num_shots=2500, method = 1
 
         # determine number of circuits to execute for this group
         num_circuits = min(2 ** (input_size), max_circuits)
-        
-        print(f"************\nExecuting [{num_circuits}] circuits with num_qubits = {num_qubits}")
 
         for _ in range(num_circuits):
 
             base = 1
             while base == 1:
                 # Ensure N is a number using the greatest bit
-                number = np.random.randint(2 ** (num_bits - 1) + 1, 2 ** num_bits)
-                order = np.random.randint(2, number)
+                number = rng.randint(2 ** (num_bits - 1) + 1, 2 ** num_bits)
+                order = rng.randint(2, number)
                 base = generate_base(number, order)
 
             # Checking if generated order can be reduced. Can also run through prime list in shors utils
@@ -410,16 +431,28 @@ def run (min_qubits=3, max_circuits=1, max_qubits=18, num_shots=2500, method = 1
 
             if verbose: print(f"Generated {number=}, {base=}, {order=}")
 
-            # create the circuit for given qubit size and order, store time metric
-            ts = time.time()
-            qc = ShorsAlgorithm(number, base, method=method, verbose=verbose)
-            metrics.store_metric(num_qubits, number_order, 'create_time', time.time()-ts)
+            if pipeline.enabled:
+                yield number_order, create_circuit(number_order, base, method, verbose)
+            else:
+                yield number_order, functools.partial(create_circuit_on_launch, num_qubits, number_order, base, method, verbose)
+
+    # Execute Benchmark Program N times for multiple circuit sizes
+    # Accumulate metrics asynchronously as circuits complete
+    for num_qubits, circuits in pipeline.pipelined(range(min_qubits, max_qubits + 1, qubit_multiple), create_group):
 
-            # collapse the 4 sub-circuit levels used in this benchmark (for qiskit)
-            qc = qc.decompose().decompose().decompose().decompose()
+        num_circuits = min(2 ** (num_qubits - 1), max_circuits)
+        print(f"************\nExecuting [{num_circuits}] circuits with num_qubits = {num_qubits}")
 
-            # submit circuit for execution on target (simulator, cloud simulator, or hardware)
-            ex.submit_circuit(qc, num_qubits, number_order, num_shots)
+        # submit circuits for execution on target (simulator, cloud simulator, or hardware)
+        for number_order, circuit in circuits:
+            if callable(circuit):
+                ex.submit_circuit(circuit, num_qubits, number_order, num_shots)
+                continue
+                
+            # store time metric of the circuit created in the background
+            pipeline.store_created(num_qubits, number_order, circuit)
+            
+            ex.submit_circuit(circuit["qc"], num_qubits, number_order, num_shots)
 
         # Wait for some active circuits to complete; report metrics when groups complete
         ex.throttle_execution(metrics.finalize_group)